@@ -2,10 +2,12 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 
 from alembic import context
 
 from app.database import Base
+from app.init_db import INIT_LOCK_KEY
 import app.models
 
 # this is the Alembic Config object, which provides
@@ -72,6 +74,10 @@ def run_migrations_online() -> None:
         )
 
         with context.begin_transaction():
+            if connection.dialect.name == "postgresql":
+                # Та же блокировка, что и у python -m app.init_db:
+                # одновременные запуски выполняются по очереди
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": INIT_LOCK_KEY})
             context.run_migrations()
 
 
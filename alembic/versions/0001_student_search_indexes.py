@@ -0,0 +1,60 @@
+"""Индексы для поиска студентов
+
+Revision ID: 0001_student_search_indexes
+Revises:
+Create Date: 2026-10-18 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_student_search_indexes'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_students_status_code", "students", ["status_code"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_students_date_of_birth", "students", ["date_of_birth"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_students_email_lower", "students", [sa.text("lower(email)")], if_not_exists=True
+    )
+    op.create_index(
+        "ix_students_last_name_prefix",
+        "students",
+        [sa.text("lower(last_name) text_pattern_ops")],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_students_first_name_prefix",
+        "students",
+        [sa.text("lower(first_name) text_pattern_ops")],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_students_name_fts",
+        "students",
+        [sa.text("to_tsvector('simple', first_name || ' ' || last_name)")],
+        postgresql_using="gin",
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_students_name_fts", table_name="students", if_exists=True)
+    op.drop_index("ix_students_first_name_prefix", table_name="students", if_exists=True)
+    op.drop_index("ix_students_last_name_prefix", table_name="students", if_exists=True)
+    op.drop_index("ix_students_email_lower", table_name="students", if_exists=True)
+    op.drop_index("ix_students_date_of_birth", table_name="students", if_exists=True)
+    op.drop_index("ix_students_status_code", table_name="students", if_exists=True)
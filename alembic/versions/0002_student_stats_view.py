@@ -0,0 +1,48 @@
+"""Материализованное представление статистики студентов
+
+Revision ID: 0002_student_stats_view
+Revises: 0001_student_search_indexes
+Create Date: 2026-10-18 11:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_student_stats_view'
+down_revision: Union[str, None] = '0001_student_search_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS student_stats AS
+        SELECT 'status' AS dimension, s.status_code AS key, s.status_label AS label, count(st.id) AS count
+        FROM student_status s
+        LEFT JOIN students st ON st.status_code = s.status_code
+        GROUP BY s.status_code, s.status_label
+        UNION ALL
+        SELECT 'birth_year', extract(year FROM date_of_birth)::int::text, NULL, count(*)
+        FROM students
+        GROUP BY 2
+        UNION ALL
+        SELECT 'created_month', to_char(date_trunc('month', created_at), 'YYYY-MM'), NULL, count(*)
+        FROM students
+        GROUP BY 2
+        """
+    )
+    # Уникальный индекс нужен для REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_student_stats_dimension_key "
+        "ON student_stats (dimension, key)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS student_stats")
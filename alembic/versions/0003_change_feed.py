@@ -0,0 +1,57 @@
+"""Лента изменений: отметки об удалении и индексы по updated_at
+
+Revision ID: 0003_change_feed
+Revises: 0002_student_stats_view
+Create Date: 2026-10-18 11:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_change_feed'
+down_revision: Union[str, None] = '0002_student_stats_view'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "student_tombstones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("entity", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "deleted_at", sa.DateTime(timezone=False), server_default=sa.func.now(), nullable=False
+        ),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_student_tombstones_deleted_at_id",
+        "student_tombstones",
+        ["deleted_at", "id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_students_updated_at_id", "students", ["updated_at", "id"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_student_extra_info_updated_at_id",
+        "student_extra_info",
+        ["updated_at", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_student_extra_info_updated_at_id", table_name="student_extra_info", if_exists=True)
+    op.drop_index("ix_students_updated_at_id", table_name="students", if_exists=True)
+    op.drop_index(
+        "ix_student_tombstones_deleted_at_id", table_name="student_tombstones", if_exists=True
+    )
+    op.drop_table("student_tombstones", if_exists=True)
@@ -0,0 +1,52 @@
+"""Время обновления в представлении статистики
+
+Revision ID: 0005_student_stats_refreshed_at
+Revises: 0004_jobs
+Create Date: 2026-10-18 12:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_student_stats_refreshed_at'
+down_revision: Union[str, None] = '0004_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATS_QUERY = """
+    SELECT 'status' AS dimension, s.status_code AS key, s.status_label AS label, count(st.id) AS count
+    FROM student_status s
+    LEFT JOIN students st ON st.status_code = s.status_code
+    GROUP BY s.status_code, s.status_label
+    UNION ALL
+    SELECT 'birth_year', extract(year FROM date_of_birth)::int::text, NULL, count(*)
+    FROM students
+    GROUP BY 2
+    UNION ALL
+    SELECT 'created_month', to_char(date_trunc('month', created_at), 'YYYY-MM'), NULL, count(*)
+    FROM students
+    GROUP BY 2
+"""
+
+
+def _create_view(body: str) -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS student_stats")
+    op.execute(f"CREATE MATERIALIZED VIEW student_stats AS {body}")
+    # Уникальный индекс нужен для REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute(
+        "CREATE UNIQUE INDEX ix_student_stats_dimension_key ON student_stats (dimension, key)"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # refreshed_at - now() на момент REFRESH, общее для всех воркеров
+    _create_view(f"SELECT stats.*, now() AS refreshed_at FROM ({STATS_QUERY}) AS stats")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _create_view(STATS_QUERY)
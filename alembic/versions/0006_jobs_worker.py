@@ -0,0 +1,30 @@
+"""Процесс-владелец фоновой задачи
+
+Revision ID: 0006_jobs_worker
+Revises: 0005_student_stats_refreshed_at
+Create Date: 2026-10-18 12:50:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_jobs_worker'
+down_revision: Union[str, None] = '0005_student_stats_refreshed_at'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("jobs", sa.Column("worker", sa.String(length=100), nullable=True))
+    op.create_index("ix_jobs_worker_status", "jobs", ["worker", "status"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_jobs_worker_status", table_name="jobs", if_exists=True)
+    op.drop_column("jobs", "worker")
@@ -0,0 +1,245 @@
+"""
+Контроль допуска запросов: ограничение частоты по клиентам и ограничение
+числа одновременно обрабатываемых запросов.
+
+Без него всплеск запросов копится в очереди пула соединений SQLAlchemy,
+пока не истечет pool_timeout, и затем все запросы падают разом.
+Здесь лишние запросы отклоняются сразу, с заголовком Retry-After:
+429 - клиент превысил свой лимит частоты (token bucket);
+503 - заняты все слоты обработки (по умолчанию pool_size + max_overflow)
+и очередь ожидания слота полна или ожидание дольше ADMISSION_QUEUE_TIMEOUT.
+
+Лимиты частоты по умолчанию выключены (RATE_LIMIT_RPS=0, RATE_LIMIT_ROUTES
+пустой) и включаются настройкой под конкретное развертывание.
+
+Клиент - значение заголовка X-API-Key, если ключ известен (RATE_LIMIT_API_KEYS),
+иначе - IP-адрес: случайные ключи не дают нового запаса токенов.
+За прокси или NAT все клиенты приходят с одного адреса и делят один лимит,
+если прокси не передает адрес клиента (uvicorn --proxy-headers).
+Тяжелые маршруты (RATE_LIMIT_ROUTES) имеют отдельные, более строгие лимиты
+в дополнение к общему.
+
+RateLimitBackend - интерфейс хранилища счетчиков. LocalRateLimitBackend
+хранит их в памяти процесса: лимиты (и ADMISSION_MAX_CONCURRENCY) действуют
+на один процесс, и при N воркерах uvicorn клиент фактически получает
+до N * RATE_LIMIT_RPS запросов в секунду. Общий лимит на все процессы дает
+внешнее хранилище (например, Redis), реализующее тот же интерфейс.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.database import engine_settings
+from app.metrics import Counter, Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_routes(value: str) -> dict[str, tuple[float, float]]:
+    """
+    "/read_users/=5:10,/export_users/=0.1:2" -> {путь: (запросов в секунду, запас)}
+    """
+    routes = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        path, budget = item.split("=", 1)
+        rate, _, burst = budget.partition(":")
+        routes[path.strip()] = (float(rate), float(burst or rate))
+    return routes
+
+
+# Общий лимит на клиента в одном процессе: запросов в секунду и запас
+# для всплесков (0 - без лимита)
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "0"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "100"))
+# Например: /read_users/=5:10,/export_users/=0.1:2,/import_users/=1:5
+RATE_LIMIT_ROUTES = _parse_routes(os.getenv("RATE_LIMIT_ROUTES", ""))
+# Ограничение одновременных запросов: по размеру пула основной БД
+ADMISSION_MAX_CONCURRENCY = int(os.getenv(
+    "ADMISSION_MAX_CONCURRENCY", str(engine_settings.pool_size + engine_settings.max_overflow)
+))
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", str(ADMISSION_MAX_CONCURRENCY)))
+# Должно быть заметно меньше pool_timeout
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1.0"))
+
+API_KEY_HEADER = b"x-api-key"
+# Известные ключи клиентов через запятую; неизвестные ключи игнорируются
+RATE_LIMIT_API_KEYS = frozenset(
+    key.strip() for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if key.strip()
+)
+# Служебные маршруты без ограничений
+EXEMPT_PATHS = frozenset({"/metrics", "/docs", "/redoc", "/openapi.json"})
+
+admission_rejected_total = registry.register(Counter(
+    "admission_rejected_total",
+    "Отклоненные запросы: rate_limit (429) или concurrency (503)",
+    ("reason", "path"),
+))
+
+
+class RateLimitBackend(ABC):
+    """
+    Интерфейс хранилища token bucket
+    """
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """
+        Забирает один токен. Возвращает 0, если токен был,
+        иначе - через сколько секунд он появится
+        """
+        ...
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """
+    Token bucket в памяти процесса.
+
+    max_keys (int) - сколько клиентов хранить, давно не обращавшиеся вытесняются по LRU
+    """
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """
+    Не более limit одновременных запросов; не более max_waiting ждут слот,
+    и не дольше timeout секунд
+    """
+
+    def __init__(self, limit: int, max_waiting: int, timeout: float) -> None:
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> bool:
+        if self._semaphore.locked():
+            if self.waiting >= self.max_waiting:
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+def client_id(scope: Scope, api_keys: frozenset[str] = RATE_LIMIT_API_KEYS) -> str:
+    for name, value in scope["headers"]:
+        if name == API_KEY_HEADER:
+            key = value.decode("latin-1")
+            if key in api_keys:
+                return "key:" + key
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware: проверка лимитов частоты, затем слот обработки
+    на все время запроса (включая отправку потокового ответа)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        backend: RateLimitBackend | None = None,
+        limiter: ConcurrencyLimiter | None = None,
+    ) -> None:
+        self.app = app
+        self.backend = backend or LocalRateLimitBackend()
+        self.limiter = limiter or ConcurrencyLimiter(
+            ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_WAITING, ADMISSION_QUEUE_TIMEOUT
+        )
+        registry.register(Gauge(
+            "admission_in_flight", "Запросов в обработке", lambda: self.limiter.in_flight,
+        ))
+        registry.register(Gauge(
+            "admission_waiting", "Запросов, ожидающих слот обработки", lambda: self.limiter.waiting,
+        ))
+
+    async def _retry_after(self, client: str, path: str) -> float:
+        """
+        0 - лимиты частоты не превышены, иначе - Retry-After в секундах
+        """
+        route_budget = RATE_LIMIT_ROUTES.get(path)
+        if route_budget and route_budget[0] > 0:
+            wait = await self.backend.take(f"{client}|{path}", *route_budget)
+            if wait:
+                return wait
+        if RATE_LIMIT_RPS > 0:
+            return await self.backend.take(client, RATE_LIMIT_RPS, RATE_LIMIT_BURST)
+        return 0.0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        # Метка маршрута для метрик: тяжелые маршруты по пути, остальные - вместе
+        label = path if path in RATE_LIMIT_ROUTES else "other"
+        retry_after = await self._retry_after(client_id(scope), path)
+        if retry_after:
+            admission_rejected_total.inc("rate_limit", label)
+            response = _reject(429, "Too many requests", retry_after)
+            await response(scope, receive, send)
+            return
+
+        if not await self.limiter.acquire():
+            admission_rejected_total.inc("concurrency", label)
+            logger.warning(f"Запрос {path} отклонен: заняты все слоты обработки")
+            response = _reject(503, "Server is busy, retry later", self.limiter.timeout)
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
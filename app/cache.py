@@ -0,0 +1,189 @@
+"""
+Кэш чтения (read-through) для часто запрашиваемых записей.
+
+CacheBackend - интерфейс хранилища. LocalCache хранит данные в памяти
+процесса с ограничением размера (LRU) и временем жизни (TTL).
+Внешнее хранилище (например, Redis) реализует тот же интерфейс и само
+отвечает за сериализацию значений.
+"""
+
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Hashable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """
+    Интерфейс хранилища кэша
+    """
+
+    @abstractmethod
+    async def get(self, key: Hashable) -> Any | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: Hashable, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: Hashable) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+
+class LocalCache(CacheBackend):
+    """
+    Кэш в памяти процесса.
+
+    max_size (int) - максимальное число записей, лишние вытесняются по LRU
+    ttl (float) - время жизни записи в секундах
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 60.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: Hashable) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ReadThroughCache:
+    """
+    Кэш чтения поверх CacheBackend со счетчиками попаданий и промахов.
+    Пустые результаты (None) не кэшируются.
+
+    Для загружаемых сейчас ключей хранится поколение инвалидаций: если запись
+    вызвала invalidate() во время загрузки, загруженное (уже устаревшее)
+    значение в кэш не сохраняется.
+    """
+
+    def __init__(self, backend: CacheBackend, name: str) -> None:
+        self.backend = backend
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        # ключ -> [число загрузок в процессе, поколение инвалидаций]
+        self._loading: dict[Hashable, list[int]] = {}
+
+    @contextmanager
+    def loading(self, keys: list[Hashable]) -> Iterator[Callable[[Hashable], bool]]:
+        """
+        Отмечает ключи как загружаемые. Возвращает проверку unchanged(key):
+        ключ отмечен и не инвалидирован с начала загрузки
+        """
+        keys = list(dict.fromkeys(keys))
+        generations = {}
+        for key in keys:
+            entry = self._loading.setdefault(key, [0, 0])
+            entry[0] += 1
+            generations[key] = entry[1]
+
+        def unchanged(key: Hashable) -> bool:
+            return key in generations and self._loading[key][1] == generations[key]
+
+        try:
+            yield unchanged
+        finally:
+            for key in keys:
+                entry = self._loading[key]
+                entry[0] -= 1
+                if not entry[0]:
+                    del self._loading[key]
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any | None]]
+    ) -> Any | None:
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        with self.loading([key]) as unchanged:
+            value = await loader()
+            if value is not None and unchanged(key):
+                await self.backend.set(key, value)
+        return value
+
+    async def get_many(self, keys: list[Hashable]) -> dict[Hashable, Any]:
+        """
+        Найденные в кэше значения по ключам (без загрузки недостающих)
+        """
+        found = {}
+        for key in keys:
+            value = await self.backend.get(key)
+            if value is not None:
+                found[key] = value
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, items: dict[Hashable, Any]) -> None:
+        for key, value in items.items():
+            await self.backend.set(key, value)
+
+    async def invalidate(self, *keys: Hashable) -> None:
+        for key in keys:
+            if key in self._loading:
+                self._loading[key][1] += 1
+            await self.backend.delete(key)
+
+    async def clear(self) -> None:
+        for entry in self._loading.values():
+            entry[1] += 1
+        await self.backend.clear()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        stats = {
+            "name": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+        if isinstance(self.backend, LocalCache):
+            stats["size"] = len(self.backend)
+            stats["max_size"] = self.backend.max_size
+            stats["ttl"] = self.backend.ttl
+        return stats
+
+
+user_cache = ReadThroughCache(
+    LocalCache(
+        max_size=int(os.getenv("USER_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+    ),
+    name="user",
+)
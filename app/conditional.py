@@ -0,0 +1,69 @@
+"""
+Условные GET-запросы (ETag / Last-Modified).
+
+Валидаторы строятся из Student.updated_at (для списков - только ETag
+из count/max(updated_at)/max(id), без Last-Modified), при совпадении
+с If-None-Match / If-Modified-Since клиенту отдается 304
+без чтения и сериализации тела.
+"""
+
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """
+    Слабый ETag из частей версии (id, updated_at, count и т.п.)
+    """
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    # updated_at хранится без часового пояса, в UTC: сессии БД работают
+    # с timezone=UTC (server_settings в app/database.py)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: datetime.datetime | None
+) -> bool:
+    """
+    Проверяет If-None-Match, а при его отсутствии - If-Modified-Since
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        # Слабое сравнение: W/"x" и "x" считаются одинаковыми
+        weak = {tag.removeprefix("W/") for tag in candidates}
+        return "*" in candidates or etag.removeprefix("W/") in weak
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        return _as_utc(last_modified) <= since
+    return False
+
+
+def set_validators(
+    response: Response, etag: str, last_modified: datetime.datetime | None
+) -> None:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+
+
+def not_modified(etag: str, last_modified: datetime.datetime | None) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
@@ -1,57 +1,823 @@
+import base64
+import datetime
+import itertools
+import json
 import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models import Student
-from app.schemas.schemas import StudentCreate, StudentRead
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import (
+    CTE,
+    Integer,
+    Select,
+    String,
+    any_,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from app.cache import user_cache
+from app.database import async_session
+from app.metrics import track_db
+from app.models import (
+    STUDENT_NAME_TSVECTOR,
+    Student,
+    StudentExtraInfo,
+    StudentStatus,
+    StudentTombstone,
+)
+from app.schemas.new.student_extra_info import (
+    StudentExtraInfoCreate,
+    StudentExtraInfoDeleteResult,
+    StudentExtraInfoGroup,
+    StudentExtraInfoRead,
+    StudentExtraInfoUpdate,
+)
+from app.schemas.schemas import (
+    ChangeItem,
+    ChangesPage,
+    StudentBatchResult,
+    StudentBulkDelete,
+    StudentBulkDeleteResult,
+    StudentCreate,
+    StudentImportError,
+    StudentImportResult,
+    StudentRead,
+    StudentReadRow,
+    StudentReadVersioned,
+)
+from app.singleflight import coalesce, forget_all
+from app.stats import stats_summary
+from app.statuses import status_registry
 
 logger = logging.getLogger(__name__)
 
+IMPORT_BATCH_SIZE = 1000  # Строк в одном INSERT при массовом импорте
+# Лента изменений отдает только изменения старше стольких секунд и старше начала
+# самой старой незавершенной пишущей транзакции (см. _changes_horizon):
+# updated_at = now() - время начала транзакции, и ее строки не должны
+# оказаться позади курсора после фиксации
+CHANGES_SAFETY_LAG = float(os.getenv("CHANGES_SAFETY_LAG", "5"))
 
-async def get_users(db: AsyncSession):
-    result = await db.execute(select(Student))
+# Коды ошибок PostgreSQL (SQLSTATE)
+UNIQUE_VIOLATION = "23505"
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def _pg_error_info(err: IntegrityError) -> tuple[str | None, str | None]:
+    """
+    Возвращает SQLSTATE и имя нарушенного ограничения из ошибки asyncpg
+    """
+    sqlstate = getattr(err.orig, "sqlstate", None)
+    constraint = getattr(getattr(err.orig, "__cause__", None), "constraint_name", None)
+    return sqlstate, constraint
+
+
+# Колонки StudentRead: списки читаются строками, без создания ORM-объектов
+STUDENT_READ_COLUMNS = (
+    Student.first_name,
+    Student.last_name,
+    Student.email,
+    Student.status_code,
+    Student.date_of_birth,
+    Student.id,
+)
+
+
+@coalesce
+@track_db
+async def get_users(
+    db: AsyncSession, limit: int = 100, after_id: int | None = None
+) -> list[StudentReadRow]:
+    """
+    Страница студентов по курсору (keyset по Student.id).
+    Возвращает не более limit записей с id > after_id.
+    """
+    stmt = select(*STUDENT_READ_COLUMNS).order_by(Student.id).limit(limit)
+    if after_id is not None:
+        stmt = stmt.where(Student.id > after_id)
+    result = await db.execute(stmt)
+    return [row._asdict() for row in result]
+
+
+@coalesce
+@track_db
+async def get_users_version(
+    db: AsyncSession, limit: int = 100, after_id: int | None = None
+) -> tuple[int, datetime.datetime | None, int | None]:
+    """
+    Версия страницы студентов для ETag: (количество, max(updated_at), max(id)).
+    Один агрегатный запрос по тем же строкам, что вернет get_users.
+    """
+    window = select(Student.id, Student.updated_at).order_by(Student.id)
+    if after_id is not None:
+        window = window.where(Student.id > after_id)
+    window = window.limit(limit).subquery()
+    result = await db.execute(
+        select(func.count(), func.max(window.c.updated_at), func.max(window.c.id))
+    )
+    return tuple(result.one())
+
+
+@asynccontextmanager
+async def _cache_loader_session(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия для загрузки промахов user_cache: сама db или, если это реплика,
+    сессия основной БД. Строка с отстающей реплики вернулась бы в кэш
+    после инвалидации, и ее увидел бы и сам писавший клиент.
+    """
+    if not db.info.get("replica", False):
+        yield db
+        return
+    async with async_session() as session:
+        yield session
+
+
+# selectinload отправляет IN (...) пачками по 500 ключей (SelectInLoader._chunksize):
+# страница больше этого дала бы лишние запросы доп. информации
+MAX_FULL_PAGE_SIZE = 500
+
+
+def _full_profile_options():
+    # status - один JOIN (многие к одному), extra_info - один запрос IN (...) на всю страницу
+    return (joinedload(Student.status), selectinload(Student.extra_info))
+
+
+@coalesce
+@track_db
+async def get_users_full(db: AsyncSession, limit: int = 100, after_id: int | None = None):
+    """
+    Страница полных профилей студентов (статус и доп. информация).
+    Всегда два запроса независимо от размера страницы (limit <= MAX_FULL_PAGE_SIZE).
+    """
+    stmt = (
+        select(Student)
+        .options(*_full_profile_options())
+        .order_by(Student.id)
+        .limit(limit)
+    )
+    if after_id is not None:
+        stmt = stmt.where(Student.id > after_id)
+    result = await db.execute(stmt)
     return result.scalars().all()
 
 
-async def get_user(db: AsyncSession, user_id: int):
-    result = await db.get(Student, user_id)
-    return result
+@coalesce
+@track_db
+async def get_user_full(db: AsyncSession, user_id: int):
+    stmt = select(Student).options(*_full_profile_options()).where(Student.id == user_id)
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def stream_users(
+    db: AsyncSession, after_id: int | None = None, chunk_size: int = 500
+) -> AsyncIterator[list[StudentReadRow]]:
+    """
+    Потоково читает студентов через серверный курсор пачками по chunk_size,
+    не загружая всю таблицу в память.
+    """
+    stmt = (
+        select(*STUDENT_READ_COLUMNS)
+        .order_by(Student.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if after_id is not None:
+        stmt = stmt.where(Student.id > after_id)
+    result = await db.stream(stmt)
+    async for chunk in result.partitions():
+        yield [row._asdict() for row in chunk]
+
+
+# Колонки выгрузки реестра (/export_users/): студент и метка статуса
+EXPORT_COLUMNS = (
+    Student.id,
+    Student.first_name,
+    Student.last_name,
+    Student.email,
+    Student.date_of_birth,
+    Student.status_code,
+    StudentStatus.status_label,
+    Student.created_at,
+    Student.updated_at,
+)
+
+
+async def stream_export(db: AsyncSession, chunk_size: int = 5000) -> AsyncIterator[list[tuple]]:
+    """
+    Потоково читает реестр студентов с меткой статуса через серверный курсор.
+    Отдает пачки кортежей в порядке EXPORT_COLUMNS.
+    """
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .outerjoin(StudentStatus, StudentStatus.status_code == Student.status_code)
+        .order_by(Student.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = await db.stream(stmt)
+    async for chunk in result.partitions():
+        yield [tuple(row) for row in chunk]
+
 
+def build_search_query(
+    name: str | None = None,
+    email: str | None = None,
+    q: str | None = None,
+    status_code: str | None = None,
+    born_from: datetime.date | None = None,
+    born_to: datetime.date | None = None,
+    limit: int = 100,
+    after_id: int | None = None,
+) -> Select:
+    """
+    Строит запрос поиска студентов. Каждое условие совпадает с выражением
+    своего индекса (см. Student.__table_args__):
+    name - префикс фамилии или имени без учета регистра (text_pattern_ops)
+    email - точное совпадение без учета регистра (lower(email))
+    q - полнотекстовый поиск по имени и фамилии (GIN по tsvector)
+    status_code, born_from/born_to - фильтр по статусу и диапазону даты рождения
+    """
+    stmt = select(*STUDENT_READ_COLUMNS).order_by(Student.id).limit(limit)
+    if name:
+        pattern = (
+            name.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            + "%"
+        )
+        stmt = stmt.where(
+            func.lower(Student.last_name).like(pattern, escape="\\")
+            | func.lower(Student.first_name).like(pattern, escape="\\")
+        )
+    if email:
+        stmt = stmt.where(func.lower(Student.email) == email.lower())
+    if q:
+        stmt = stmt.where(
+            text(f"{STUDENT_NAME_TSVECTOR} @@ plainto_tsquery('simple', :q)").bindparams(q=q)
+        )
+    if status_code:
+        stmt = stmt.where(Student.status_code == status_code)
+    if born_from:
+        stmt = stmt.where(Student.date_of_birth >= born_from)
+    if born_to:
+        stmt = stmt.where(Student.date_of_birth <= born_to)
+    if after_id is not None:
+        stmt = stmt.where(Student.id > after_id)
+    return stmt
 
-async def create_user(db: AsyncSession, user: StudentCreate):
-    db_user = Student(**user.model_dump())
+
+@coalesce
+@track_db
+async def search_users(db: AsyncSession, **filters) -> list[StudentReadRow]:
+    result = await db.execute(build_search_query(**filters))
+    return [row._asdict() for row in result]
+
+
+@coalesce
+@track_db
+async def get_user(db: AsyncSession, user_id: int) -> StudentReadVersioned | None:
+    async def load() -> StudentReadVersioned | None:
+        async with _cache_loader_session(db) as session:
+            user = await session.get(Student, user_id)
+            return StudentReadVersioned.model_validate(user) if user else None
+
+    return await user_cache.get_or_load(user_id, load)
+
+
+@coalesce
+@track_db
+async def get_users_batch(
+    db: AsyncSession, ids: list[int], emails: list[str]
+) -> StudentBatchResult:
+    """
+    Пакетное чтение студентов: сначала кэш по id, остальное - одним запросом
+    WHERE id = ANY(:ids) OR lower(email) = ANY(:emails)
+    (массив передается одним параметром, текст запроса не зависит от числа id).
+    Порядок результата - как в запросе.
+    """
+    ids = list(dict.fromkeys(ids))
+    emails = list(dict.fromkeys(email.lower() for email in emails))
+    by_id: dict[int, StudentReadVersioned] = await user_cache.get_many(ids)
+
+    ids_to_load = [user_id for user_id in ids if user_id not in by_id]
+    conditions = []
+    if ids_to_load:
+        conditions.append(Student.id == any_(literal(ids_to_load, ARRAY(Integer))))
+    if emails:
+        conditions.append(func.lower(Student.email) == any_(literal(emails, ARRAY(String))))
+    if conditions:
+        with user_cache.loading(ids_to_load) as unchanged:
+            async with _cache_loader_session(db) as session:
+                result = await session.execute(
+                    select(*STUDENT_READ_COLUMNS, Student.updated_at).where(or_(*conditions))
+                )
+                loaded = {
+                    row.id: StudentReadVersioned.model_validate(row._mapping) for row in result
+                }
+            # Только строки, запрошенные по id и не измененные за время запроса
+            await user_cache.set_many(
+                {user_id: user for user_id, user in loaded.items() if unchanged(user_id)}
+            )
+        by_id.update(loaded)
+
+    by_email = {user.email.lower(): user for user in by_id.values()}
+    items = [by_id[user_id] for user_id in ids if user_id in by_id]
+    seen = {user.id for user in items}
+    for email in emails:
+        user = by_email.get(email)
+        if user is not None and user.id not in seen:
+            items.append(user)
+            seen.add(user.id)
+    return StudentBatchResult(
+        items=items,
+        missing_ids=[user_id for user_id in ids if user_id not in by_id],
+        missing_emails=[email for email in emails if email not in by_email],
+    )
+
+
+@track_db
+async def create_user(db: AsyncSession, user: StudentCreate, upsert: bool = False):
+    """
+    Создает студента одним запросом INSERT ... RETURNING (без повторного SELECT).
+    upsert=True - идемпотентный режим для повторяющих запрос клиентов:
+    при существующем email запись обновляется данными запроса (ON CONFLICT (email)),
+    а если данные не отличаются - не изменяется (updated_at, ETag и лента
+    изменений остаются прежними) и возвращается как есть.
+    """
+    await status_registry.ensure_loaded(db)
+    if not status_registry.is_valid(user.status_code):
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "Unknown status_code", "field": "status_code"}
+        )
+    values = user.model_dump()
+    stmt = pg_insert(Student).values(**values)
+    if upsert:
+        updated = [key for key in values if key != "email"]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Student.email],
+            set_={
+                **{key: stmt.excluded[key] for key in updated},
+                "updated_at": func.now(),
+            },
+            # Повтор с теми же данными не переписывает строку: RETURNING будет пустым
+            where=or_(*(
+                getattr(Student, key).is_distinct_from(stmt.excluded[key]) for key in updated
+            )),
+        )
     try:
-        db.add(db_user)
+        db_user = await db.scalar(
+            stmt.returning(Student), execution_options={"populate_existing": True}
+        )
+        if db_user is None:
+            db_user = await db.scalar(select(Student).where(Student.email == user.email))
+            await db.commit()
+            return db_user
         await db.commit()
-        await db.refresh(db_user)
-        return db_user
+        forget_all()
     except IntegrityError as err:
-        err_str = str(err)
-        if "unique constraint" in err_str and "ix_students_email" in err_str:
+        await db.rollback()
+        sqlstate, constraint = _pg_error_info(err)
+        if sqlstate == UNIQUE_VIOLATION and constraint == "ix_students_email":
             logger.error(str(err))
             raise HTTPException(
                 status_code=409,
                 detail={"message": "Email already exists", "field": "email"}
             )
-    
+        if sqlstate == FOREIGN_KEY_VIOLATION:
+            # Статус удален из справочника после загрузки реестра
+            status_registry.invalidate()
+            raise HTTPException(
+                status_code=422,
+                detail={"message": "Unknown status_code", "field": "status_code"}
+            )
+        raise
+    await user_cache.invalidate(db_user.id)
+    stats_summary.mark_dirty()
+    return db_user
 
 
-async def delete_user(db: AsyncSession, user_id: int):
-    user = await db.get(Student, user_id)
-    if user:
-        await db.delete(user)
+@track_db
+async def import_users(
+    db: AsyncSession, rows: list[dict], batch_size: int = IMPORT_BATCH_SIZE
+) -> StudentImportResult:
+    """
+    Массовый импорт студентов.
+    Строки проверяются заранее (схема, status_code, дубликаты внутри пачки),
+    затем вставляются многострочным INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    Ошибочные строки попадают в errors и не прерывают импорт остальных.
+    """
+    errors: list[StudentImportError] = []
+    valid: list[tuple[int, dict]] = []
+    seen_emails: set[str] = set()
+
+    await status_registry.ensure_loaded(db)
+    known_statuses = status_registry.codes()
+
+    for row_num, raw in enumerate(rows):
+        try:
+            user = StudentCreate.model_validate(raw)
+        except ValidationError as err:
+            errors.append(StudentImportError(
+                row=row_num,
+                type="validation_error",
+                msg="; ".join(
+                    f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in err.errors()
+                ),
+                email=raw.get("email") if isinstance(raw, dict) else None,
+            ))
+            continue
+        if user.status_code not in known_statuses:
+            errors.append(StudentImportError(
+                row=row_num,
+                type="invalid_status",
+                msg=f"Unknown status_code: {user.status_code}",
+                email=user.email,
+            ))
+            continue
+        if user.email in seen_emails:
+            errors.append(StudentImportError(
+                row=row_num,
+                type="duplicate_email",
+                msg="Email duplicated in import data",
+                email=user.email,
+            ))
+            continue
+        seen_emails.add(user.email)
+        valid.append((row_num, user.model_dump()))
+
+    created_ids: list[int] = []
+    for start in range(0, len(valid), batch_size):
+        batch = valid[start:start + batch_size]
+        stmt = (
+            pg_insert(Student)
+            .values([values for _, values in batch])
+            .on_conflict_do_nothing(index_elements=[Student.email])
+            .returning(Student.id, Student.email)
+        )
+        inserted = {email: user_id for user_id, email in (await db.execute(stmt)).all()}
         await db.commit()
-        return True
-    return False
+        forget_all()
+        for row_num, values in batch:
+            user_id = inserted.get(values["email"])
+            if user_id is None:
+                errors.append(StudentImportError(
+                    row=row_num,
+                    type="duplicate_email",
+                    msg="Email already exists",
+                    email=values["email"],
+                ))
+            else:
+                created_ids.append(user_id)
+                await user_cache.invalidate(user_id)
+        logger.debug(f"Импорт: пачка {start // batch_size + 1}, вставлено {len(inserted)}")
+
+    errors.sort(key=lambda e: e.row)
+    if created_ids:
+        stats_summary.mark_dirty()
+    return StudentImportResult(
+        total=len(rows),
+        created=len(created_ids),
+        created_ids=created_ids,
+        errors=errors,
+    )
+
+
+def _bulk_filter(params: StudentBulkDelete) -> list:
+    conditions = []
+    if params.ids:
+        conditions.append(Student.id.in_(params.ids))
+    if params.status_code:
+        conditions.append(Student.status_code == params.status_code)
+    if params.born_to:
+        conditions.append(Student.date_of_birth <= params.born_to)
+    return conditions
+
+
+def _delete_students_stmt(conditions: list, cascade: bool, *returning) -> Select:
+    """
+    DELETE ... RETURNING по условиям одним запросом, с отметками об удалении
+    (student_tombstones) для ленты изменений.
+    При cascade доп. информация удаляется в CTE того же запроса: проверка
+    внешнего ключа выполняется в конце запроса, когда строки уже удалены.
+    """
+    deleted = (
+        delete(Student)
+        .where(*conditions)
+        .returning(*(returning or (Student.id,)))
+        .cte("deleted_students")
+    )
+    ctes = [_tombstones_cte("student", deleted)]
+    if cascade:
+        deleted_info = (
+            delete(StudentExtraInfo)
+            .where(StudentExtraInfo.student_id.in_(select(Student.id).where(*conditions)))
+            .returning(StudentExtraInfo.id)
+            .cte("deleted_extra_info")
+        )
+        ctes += [deleted_info, _tombstones_cte("extra_info", deleted_info)]
+    return select(*deleted.c).add_cte(*ctes)
 
 
+def _tombstones_cte(entity: str, deleted: CTE) -> CTE:
+    return (
+        insert(StudentTombstone)
+        .from_select(["entity", "entity_id"], select(literal(entity), deleted.c.id))
+        .cte(f"{entity}_tombstone_rows")
+    )
+
+
+@track_db
+async def delete_users(db: AsyncSession, params: StudentBulkDelete) -> StudentBulkDeleteResult:
+    """
+    Массовое удаление (mode=delete) или архивирование (mode=archive) одним запросом.
+    Возвращает id затронутых студентов.
+    """
+    conditions = _bulk_filter(params)
+    if params.mode == "archive":
+        await status_registry.ensure_loaded(db)
+        if not status_registry.is_valid(params.archive_status):
+            raise HTTPException(
+                status_code=422,
+                detail={"message": "Unknown status_code", "field": "archive_status"}
+            )
+        stmt = (
+            update(Student)
+            .where(*conditions, Student.status_code != params.archive_status)
+            .values(status_code=params.archive_status, updated_at=func.now())
+            .returning(Student.id)
+        )
+    else:
+        stmt = _delete_students_stmt(conditions, params.cascade)
+    try:
+        ids = list((await db.execute(stmt)).scalars())
+        await db.commit()
+        forget_all()
+    except IntegrityError as err:
+        await db.rollback()
+        if _pg_error_info(err)[0] == FOREIGN_KEY_VIOLATION:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Students have extra info, use cascade", "field": "cascade"}
+            )
+        raise
+    await user_cache.invalidate(*ids)
+    stats_summary.mark_dirty()
+    logger.info(f"Массовая операция {params.mode}: затронуто студентов {len(ids)}")
+    return StudentBulkDeleteResult(mode=params.mode, affected=len(ids), ids=ids)
+
+
+@track_db
+async def delete_user(db: AsyncSession, user_id: int):
+    result = await db.execute(_delete_students_stmt([Student.id == user_id], cascade=True))
+    deleted = result.scalar_one_or_none() is not None
+    await db.commit()
+    forget_all()
+    await user_cache.invalidate(user_id)
+    stats_summary.mark_dirty()
+    return deleted
+
+
+@track_db
 async def delete_user_check(db: AsyncSession, user_id: int):
-    user = await db.get(Student, user_id)
-    if user:
-        await db.delete(user)
+    stmt = _delete_students_stmt([Student.id == user_id], True, *Student.__table__.c)
+    result = await db.execute(stmt)
+    user = result.one_or_none()
+    await db.commit()
+    forget_all()
+    await user_cache.invalidate(user_id)
+    stats_summary.mark_dirty()
+    return StudentRead.model_validate(user._mapping) if user else None
+
+
+@track_db
+async def create_extra_info(
+    db: AsyncSession, items: list[StudentExtraInfoCreate]
+) -> list[StudentExtraInfo]:
+    """
+    Добавляет пачку доп. информации одним многострочным INSERT ... RETURNING.
+    Пачка вставляется целиком: при неизвестном student_id не вставляется ничего.
+    """
+    stmt = (
+        insert(StudentExtraInfo)
+        .values([item.model_dump() for item in items])
+        .returning(StudentExtraInfo)
+    )
+    try:
+        created = list(await db.scalars(stmt))
         await db.commit()
-        return StudentRead.model_validate(user)
-    return None
+        forget_all()
+    except IntegrityError as err:
+        await db.rollback()
+        if _pg_error_info(err)[0] != FOREIGN_KEY_VIOLATION:
+            raise
+        # Ошибка - редкий путь: только здесь выясняем, каких студентов нет
+        requested = {item.student_id for item in items}
+        existing = set(await db.scalars(select(Student.id).where(Student.id.in_(requested))))
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": "Unknown student_id",
+                "field": "student_id",
+                "ids": sorted(requested - existing),
+            }
+        )
+    logger.debug(f"Добавлено записей доп. информации: {len(created)}")
+    return created
+
+
+@coalesce
+@track_db
+async def get_extra_info(
+    db: AsyncSession, student_ids: list[int], info_type: str | None = None
+) -> list[StudentExtraInfoGroup]:
+    """
+    Доп. информация нескольких студентов одним запросом student_id IN (...),
+    сгруппированная по студентам в порядке student_ids.
+    """
+    student_ids = list(dict.fromkeys(student_ids))
+    stmt = (
+        select(*StudentExtraInfo.__table__.c)
+        .where(StudentExtraInfo.student_id.in_(student_ids))
+        .order_by(StudentExtraInfo.student_id, StudentExtraInfo.id)
+    )
+    if info_type is not None:
+        stmt = stmt.where(StudentExtraInfo.info_type == info_type)
+    result = await db.execute(stmt)
+    grouped = {
+        student_id: [StudentExtraInfoRead.model_validate(row._mapping) for row in rows]
+        for student_id, rows in itertools.groupby(result, key=lambda row: row.student_id)
+    }
+    return [
+        StudentExtraInfoGroup(student_id=student_id, items=grouped.get(student_id, []))
+        for student_id in student_ids
+    ]
+
+
+@track_db
+async def update_extra_info(
+    db: AsyncSession, info_id: int, data: StudentExtraInfoUpdate
+) -> StudentExtraInfo | None:
+    # updated_at задается явно: по нему запись попадает в ленту изменений
+    stmt = (
+        update(StudentExtraInfo)
+        .where(StudentExtraInfo.id == info_id)
+        .values(**data.model_dump(), updated_at=func.now())
+        .returning(StudentExtraInfo)
+    )
+    info = await db.scalar(stmt, execution_options={"populate_existing": True})
+    await db.commit()
+    forget_all()
+    return info
+
+
+@track_db
+async def delete_extra_info(db: AsyncSession, ids: list[int]) -> StudentExtraInfoDeleteResult:
+    """
+    Удаляет доп. информацию по списку id одним запросом с отметками об удалении
+    """
+    deleted = (
+        delete(StudentExtraInfo)
+        .where(StudentExtraInfo.id.in_(ids))
+        .returning(StudentExtraInfo.id)
+        .cte("deleted_extra_info")
+    )
+    stmt = select(deleted.c.id).add_cte(_tombstones_cte("extra_info", deleted))
+    deleted_ids = list((await db.execute(stmt)).scalars())
+    await db.commit()
+    forget_all()
+    return StudentExtraInfoDeleteResult(deleted=len(deleted_ids), ids=deleted_ids)
+
+
+def _encode_cursor(marks: dict[str, tuple[datetime.datetime, int]]) -> str:
+    payload = {key: [ts.isoformat(), row_id] for key, (ts, row_id) in marks.items()}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _decode_cursor(cursor: str | None) -> dict[str, tuple[datetime.datetime, int]]:
+    if not cursor:
+        return {}
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {
+            key: (datetime.datetime.fromisoformat(ts), int(row_id))
+            for key, (ts, row_id) in payload.items()
+        }
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Invalid cursor", "field": "since"}
+        )
+
+
+def _student_change(student: Student) -> ChangeItem:
+    return ChangeItem(
+        entity="student",
+        op="upsert",
+        id=student.id,
+        changed_at=student.updated_at,
+        data=StudentReadVersioned.model_validate(student).model_dump(mode="json"),
+    )
+
+
+def _extra_info_change(info: StudentExtraInfo) -> ChangeItem:
+    return ChangeItem(
+        entity="extra_info",
+        op="upsert",
+        id=info.id,
+        changed_at=info.updated_at,
+        data={
+            "student_id": info.student_id,
+            "info_type": info.info_type,
+            "info_value": info.info_value,
+            "updated_at": info.updated_at.isoformat(),
+        },
+    )
+
+
+def _tombstone_change(tombstone: StudentTombstone) -> ChangeItem:
+    return ChangeItem(
+        entity=tombstone.entity,
+        op="delete",
+        id=tombstone.entity_id,
+        changed_at=tombstone.deleted_at,
+    )
+
+
+# Потоки ленты: ключ в курсоре, модель, колонка времени, преобразование в ChangeItem
+CHANGE_STREAMS = (
+    ("students", Student, Student.updated_at, _student_change),
+    ("extra_info", StudentExtraInfo, StudentExtraInfo.updated_at, _extra_info_change),
+    ("tombstones", StudentTombstone, StudentTombstone.deleted_at, _tombstone_change),
+)
+
+
+async def _changes_horizon(db: AsyncSession):
+    """
+    Граница ленты: now() - CHANGES_SAFETY_LAG, но не позже начала самой старой
+    незавершенной пишущей транзакции (долгое массовое удаление или архивирование).
+    xact_start чужих сессий виден, так как все соединения приложения - одна роль.
+    """
+    horizon = func.now() - datetime.timedelta(seconds=CHANGES_SAFETY_LAG)
+    if (await db.connection()).dialect.name != "postgresql":
+        return horizon
+    oldest_write = (
+        select(func.min(text("xact_start")))
+        .select_from(text("pg_stat_activity"))
+        .where(text("backend_xid IS NOT NULL AND datname = current_database()"))
+        .scalar_subquery()
+    )
+    return func.least(horizon, func.coalesce(oldest_write, horizon))
+
+
+@coalesce
+@track_db
+async def get_changes(db: AsyncSession, since: str | None, limit: int = 500) -> ChangesPage:
+    """
+    Изменения студентов и доп. информации после курсора since, включая удаления.
+    Курсор хранит водяной знак (updated_at, id) для каждого потока,
+    каждый поток читается по индексу (updated_at, id), так что стоимость
+    пропорциональна числу изменений, а не размеру таблиц.
+    """
+    marks = _decode_cursor(since)
+    horizon = await _changes_horizon(db)
+
+    candidates = []
+    has_more = False
+    for key, model, ts_column, to_change in CHANGE_STREAMS:
+        stmt = (
+            select(model)
+            .where(ts_column < horizon)
+            .order_by(ts_column, model.id)
+            .limit(limit + 1)
+        )
+        if key in marks:
+            stmt = stmt.where(tuple_(ts_column, model.id) > tuple_(*marks[key]))
+        rows = (await db.execute(stmt)).scalars().all()
+        has_more |= len(rows) > limit
+        candidates += [
+            (getattr(row, ts_column.key), row.id, key, to_change(row)) for row in rows[:limit]
+        ]
+
+    candidates.sort(key=lambda item: (item[0], item[2], item[1]))
+    has_more |= len(candidates) > limit
+    taken = candidates[:limit]
+    for ts, row_id, key, _ in taken:
+        marks[key] = (ts, row_id)
 
+    return ChangesPage(
+        items=[change for *_, change in taken],
+        cursor=_encode_cursor(marks),
+        has_more=has_more,
+    )
@@ -3,10 +3,17 @@
 Иициализация БД
 """
 
+import asyncio
+import functools
+import itertools
 import logging
 import os
+import time
+from dataclasses import dataclass, replace
+from typing import Callable
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
 import dotenv
@@ -31,52 +38,239 @@ class Base(DeclarativeBase):
     pass
 
 
-if not os.getenv("DB_USER") or len(str(os.getenv("DB_USER"))) < 2:
-    err_message = "Переменная DB_USER ( Имя пользователя БД) в памяти не найдена."
-    logger.warning(err_message)
-if not os.getenv("DB_PASSWORD") or len(str(os.getenv("DB_PASSWORD"))) < 2:
-    err_message = (
-        "Переменная DB_PASSWORD (Пароль пользователя БД) в памяти  не найдена."
-    )
-    logger.warning(err_message)
-if not os.getenv("DB_HOST") or len(str(os.getenv("DB_HOST"))) < 2:
-    err_message = "Переменная DB_HOST (Хост БД) в памяти  не найдена."
-    logger.warning(err_message)
-if not os.getenv("DB_PORT") or len(str(os.getenv("DB_PORT"))) < 2:
-    err_message = "Переменная DB_PORT (Порт подключения к БД) в памяти  не найдена."
-    logger.warning(err_message)
-if not os.getenv("DB_NAME") or len(str(os.getenv("DB_NAME"))) < 2:
-    err_message = "Переменная DB_NAME (Имя БД) в памяти  не найдена."
-    logger.warning(err_message)
-
+# .env не обязателен: настройки могут прийти из окружения (docker env_file, systemd)
+if dotenv.load_dotenv():
+    logger.info("Найден и загружен файл с настройками .env")
+else:
+    logger.info("Файл .env не найден, настройки берутся из окружения")
 
-"""
 # === Проверка переменных окружения ===
-REQUIRED_ENV_VARS = ["DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT", "DB_NAME"]
-
-for var in REQUIRED_ENV_VARS:
-    value = os.getenv(var)
-    if not value or len(value.strip()) < 1:
-        logger.warning(f"Переменная {var} не найдена или пуста")
-"""
-
-if not dotenv.load_dotenv():
-    err_message = "Файл .env с настройками не найден"
-    logger.error(err_message)
-    raise (EnverontmentVariableNotFound(err_message))
-else:
-    info_message = "Найден и загружен файл с настройками .env"
-    logger.info(info_message)
+REQUIRED_ENV_VARS = {
+    "DB_USER": "Имя пользователя БД",
+    "DB_PASSWORD": "Пароль пользователя БД",
+    "DB_HOST": "Хост БД",
+    "DB_PORT": "Порт подключения к БД",
+    "DB_NAME": "Имя БД",
+}
+for var, description in REQUIRED_ENV_VARS.items():
+    if not os.getenv(var, "").strip():
+        logger.warning(f"Переменная {var} ({description}) не найдена")
 
 DATABASE_URL = (
     f"postgresql+asyncpg://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
     f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
 )
 
-engine = create_async_engine(
-    DATABASE_URL, 
-    echo=True, 
-    pool_pre_ping=True, # Проверка соединения перед использованием
-    pool_recycle=300, # Пересоздавать соединения каждые 300 секунд
-)
+
+@dataclass(frozen=True)
+class EngineSettings:
+    """
+    Настройки движка и пула соединений
+
+    pool_size (int) - число постоянных соединений в пуле
+    max_overflow (int) - сколько соединений можно открыть сверх pool_size
+    pool_timeout (float) - сколько секунд ждать свободное соединение
+    pool_recycle (int) - через сколько секунд пересоздавать соединение
+    pool_pre_ping (bool) - проверять соединение перед выдачей из пула
+    echo (bool) - логировать все SQL-запросы
+    statement_cache_size (int) - размер кэша подготовленных запросов asyncpg
+    """
+
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 300
+    pool_pre_ping: bool = True
+    echo: bool = False
+    statement_cache_size: int = 100
+
+
+# Профили окружений, выбираются переменной DB_PROFILE (по умолчанию prod:
+# без логирования SQL; dev включается явно для локальной разработки).
+# Отдельные параметры переопределяются переменными DB_POOL_SIZE и т.д.
+ENGINE_PROFILES: dict[str, EngineSettings] = {
+    "dev": EngineSettings(pool_size=5, max_overflow=5, echo=True),
+    "test": EngineSettings(pool_size=2, max_overflow=0, pool_timeout=5.0),
+    "prod": EngineSettings(
+        pool_size=20,
+        max_overflow=10,
+        pool_timeout=10.0,
+        pool_recycle=1800,
+        pool_pre_ping=False,
+        statement_cache_size=500,
+    ),
+}
+
+
+def _env_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def load_engine_settings() -> EngineSettings:
+    """
+    Собирает настройки движка: профиль DB_PROFILE + переопределения из окружения
+    """
+    profile = os.getenv("DB_PROFILE", "prod")
+    if profile not in ENGINE_PROFILES:
+        err_message = f"Неизвестный профиль DB_PROFILE={profile}, доступны: {', '.join(ENGINE_PROFILES)}"
+        logger.error(err_message)
+        raise EnverontmentVariableNotFound(err_message)
+    settings = ENGINE_PROFILES[profile]
+
+    overrides = {
+        "pool_size": ("DB_POOL_SIZE", int),
+        "max_overflow": ("DB_MAX_OVERFLOW", int),
+        "pool_timeout": ("DB_POOL_TIMEOUT", float),
+        "pool_recycle": ("DB_POOL_RECYCLE", int),
+        "pool_pre_ping": ("DB_POOL_PRE_PING", _env_bool),
+        "echo": ("DB_ECHO", _env_bool),
+        "statement_cache_size": ("DB_STATEMENT_CACHE_SIZE", int),
+    }
+    values = {
+        field: cast(os.environ[var])
+        for field, (var, cast) in overrides.items()
+        if os.getenv(var)
+    }
+    return replace(settings, **values)
+
+
+def create_engine_from_settings(url: str, settings: EngineSettings) -> AsyncEngine:
+    """
+    Создает асинхронный движок по настройкам и логирует итоговую конфигурацию пула
+    """
+    logger.info(
+        "Пул соединений: pool_size=%s max_overflow=%s pool_timeout=%s "
+        "pool_recycle=%s pool_pre_ping=%s echo=%s statement_cache_size=%s",
+        settings.pool_size,
+        settings.max_overflow,
+        settings.pool_timeout,
+        settings.pool_recycle,
+        settings.pool_pre_ping,
+        settings.echo,
+        settings.statement_cache_size,
+    )
+    if settings.echo:
+        # Вместо echo=True (свой обработчик с синхронным выводом) - уровень логгера,
+        # записи идут через общую очередь логирования (app/log_config.py)
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+    return create_async_engine(
+        url,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_pre_ping=settings.pool_pre_ping,  # Проверка соединения перед использованием
+        pool_recycle=settings.pool_recycle,  # Пересоздавать соединения через pool_recycle секунд
+        connect_args={
+            # Кэш подготовленных запросов asyncpg (0 - выключен, нужно для pgbouncer)
+            "statement_cache_size": settings.statement_cache_size,
+            "prepared_statement_cache_size": settings.statement_cache_size,
+            # Столбцы updated_at/created_at - timestamp без часового пояса, now()
+            # пишет в них время в часовом поясе сессии: фиксируем UTC, чтобы
+            # значения не зависели от настроек сервера и роли
+            "server_settings": {"timezone": "UTC"},
+        },
+    )
+
+
+class LazyEngine:
+    """
+    AsyncEngine, который создается при первом обращении (первом запросе к БД),
+    а не при импорте модуля. Все атрибуты проксируются на созданный движок.
+    """
+
+    def __init__(self, factory: Callable[[], AsyncEngine]) -> None:
+        self._factory = factory
+        self._engine: AsyncEngine | None = None
+
+    @property
+    def created(self) -> bool:
+        return self._engine is not None
+
+    def get(self) -> AsyncEngine:
+        if self._engine is None:
+            start = time.perf_counter()
+            self._engine = self._factory()
+            logger.info(f"Движок БД создан за {(time.perf_counter() - start) * 1000:.1f} мс")
+        return self._engine
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+    async def dispose(self) -> None:
+        # Несозданный движок нечего закрывать
+        if self._engine is not None:
+            await self._engine.dispose()
+
+
+engine_settings = load_engine_settings()
+engine = LazyEngine(functools.partial(create_engine_from_settings, DATABASE_URL, engine_settings))
 async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+class ReplicaSet:
+    """
+    Реплики только для чтения с выбором по кругу (round-robin).
+
+    Реплики проверяются запросом SELECT 1 (check_health / run_health_checks),
+    недоступные пропускаются. Если реплик нет или все недоступны,
+    чтение идет с основной БД.
+    """
+
+    def __init__(self, urls: list[str], settings: EngineSettings) -> None:
+        self.engines = [
+            LazyEngine(functools.partial(create_engine_from_settings, url, settings))
+            for url in urls
+        ]
+        # info["replica"]: по сессии видно, что данные могут отставать (см. crud.get_user)
+        self.sessions = [
+            async_sessionmaker(e, expire_on_commit=False, info={"replica": True})
+            for e in self.engines
+        ]
+        self.healthy = [True] * len(self.engines)
+        self._next = itertools.cycle(range(len(self.engines)))
+
+    def session(self) -> async_sessionmaker:
+        """
+        Фабрика сессий следующей доступной реплики (или основной БД)
+        """
+        for _ in range(len(self.engines)):
+            index = next(self._next)
+            if self.healthy[index]:
+                return self.sessions[index]
+        return async_session
+
+    async def check_health(self) -> None:
+        for index, replica in enumerate(self.engines):
+            try:
+                async with replica.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                healthy = True
+            except Exception as err:
+                healthy = False
+                if self.healthy[index]:
+                    logger.warning(f"Реплика {replica.url.host} недоступна: {err}")
+            if healthy and not self.healthy[index]:
+                logger.info(f"Реплика {replica.url.host} снова доступна")
+            self.healthy[index] = healthy
+
+    async def run_health_checks(self, interval: float) -> None:
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        for replica in self.engines:
+            await replica.dispose()
+
+
+# Реплики: DB_REPLICA_HOSTS=host1:5432,host2:5432 (логин, пароль и имя БД как у основной)
+REPLICA_URLS = [
+    f"postgresql+asyncpg://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{host.strip()}/{os.getenv('DB_NAME')}"
+    for host in os.getenv("DB_REPLICA_HOSTS", "").split(",")
+    if host.strip()
+]
+REPLICA_HEALTH_INTERVAL = float(os.getenv("DB_REPLICA_HEALTH_INTERVAL", "5"))
+# Сколько секунд после записи клиент читает с основной БД (read-your-writes)
+REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+
+replicas = ReplicaSet(REPLICA_URLS, engine_settings)
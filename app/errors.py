@@ -0,0 +1,126 @@
+"""
+Глобальная обработка ошибок.
+
+Вместо @app.middleware("http") (BaseHTTPMiddleware создает отдельную задачу
+и поток для каждого запроса) используются:
+- обработчики исключений FastAPI для ошибок валидации и БД;
+- тонкий ASGI middleware для всех остальных (неожиданных) исключений.
+
+Формат ответов прежний:
+422 - ошибки валидации, 400 - database_error, 500 - server_error с error_id.
+"""
+
+import logging
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """
+    Ошибки валидации входных данных (Pydantic).
+    Считаем их и возвращаем стандартный ответ FastAPI (422).
+    """
+    # Уровень DEBUG, чтобы не засорять логи в production
+    logger.debug("Validation error", exc_info=exc)
+    metrics.app_errors_total.inc("validation")
+    return await request_validation_exception_handler(request, exc)
+
+
+async def database_error_handler(request: Request, exc: SQLAlchemyError):
+    """
+    Ошибки базы данных (SQLAlchemy).
+    Откат транзакции выполняет сессия из get_db при закрытии,
+    клиенту детали ошибки не раскрываются.
+    """
+    # Логируем полную ошибку для администратора
+    logger.error("Database error", exc_info=exc)
+    metrics.app_errors_total.inc("database")
+
+    return JSONResponse(
+        status_code=400,  # HTTP 400 Bad Request - общий код для ошибок клиента
+        content={
+            "detail": [{
+                "type": "database_error",
+                "msg": "Database operation failed",
+                # В production показываем общее сообщение, в debug режиме - детали
+                "ctx": {"error": str(exc)} if request.app.debug else {"error": "Check logs for details"}
+            }]
+        }
+    )
+
+
+def server_error_response(exc: Exception) -> JSONResponse:
+    """
+    Ответ на неожиданное исключение.
+    Генерирует уникальный ID ошибки для поиска в логах.
+    """
+    error_id = uuid.uuid4()
+
+    # Логируем критическую ошибку с полной информацией
+    logger.critical(
+        f"Unexpected error {error_id}: {exc}", exc_info=exc, extra={"error_id": error_id}
+    )
+    metrics.app_errors_total.inc("unexpected")
+
+    return JSONResponse(
+        status_code=500,  # HTTP 500 Internal Server Error
+        content={
+            "detail": [{
+                "type": "server_error",
+                "msg": "Internal server error",
+                "error_id": str(error_id),  # Уникальный ID для поиска в логах
+                "info": "Contact support with this error_id"  # Инструкция для пользователя
+            }]
+        }
+    )
+
+
+class ServerErrorMiddleware:
+    """
+    ASGI middleware для неожиданных исключений.
+    Если ответ еще не начат - отправляет 500 с error_id,
+    иначе (например, при обрыве потоковой выдачи) пробрасывает исключение дальше.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            if response_started:
+                raise
+            response = server_error_response(exc)
+            await response(scope, receive, send)
+
+
+def register_error_handlers(app: FastAPI) -> None:
+    """
+    Подключает обработчики ошибок к приложению
+    """
+    app.add_exception_handler(RequestValidationError, validation_error_handler)
+    app.add_exception_handler(SQLAlchemyError, database_error_handler)
+    app.add_middleware(ServerErrorMiddleware)
@@ -0,0 +1,83 @@
+"""
+Выгрузка реестра студентов (/export_users/).
+
+Строки читаются серверным курсором пачками (crud.stream_export) и сразу
+кодируются в байты, так что память не зависит от размера таблицы.
+
+Форматы:
+csv - CSV с заголовком;
+columns - столбцовый формат для аналитики: NDJSON, первая строка - схема
+{"schema": {"колонка": "тип", ...}}, далее каждая строка - пачка записей
+в виде {"колонка": [значения, ...]} (как record batch в Arrow / Parquet).
+"""
+
+import csv
+import io
+import zlib
+from typing import AsyncIterator
+
+from pydantic_core import to_json
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import crud
+
+EXPORT_CHUNK_SIZE = 5000  # Строк в одной пачке курсора
+GZIP_LEVEL = 6
+
+EXPORT_COLUMN_NAMES = [column.key for column in crud.EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "columns": ("application/x-ndjson", "columns.jsonl"),
+}
+
+
+async def csv_chunks(chunks: AsyncIterator[list[tuple]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMN_NAMES)
+    async for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Пустая таблица: только заголовок
+        yield buffer.getvalue().encode()
+
+
+async def column_chunks(chunks: AsyncIterator[list[tuple]]) -> AsyncIterator[bytes]:
+    schema = {
+        column.key: column.type.python_type.__name__ for column in crud.EXPORT_COLUMNS
+    }
+    yield to_json({"schema": schema}) + b"\n"
+    async for chunk in chunks:
+        yield to_json(dict(zip(EXPORT_COLUMN_NAMES, zip(*chunk)))) + b"\n"
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Сжимает поток в gzip по мере отправки (wbits=31 - заголовок gzip)
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def export_users(
+    session_factory: async_sessionmaker, fmt: str, gzip: bool = False
+) -> AsyncIterator[bytes]:
+    """
+    Тело ответа выгрузки. Сессия открывается внутри генератора,
+    как и в stream_users_ndjson: она нужна до конца отправки.
+    """
+    async with session_factory() as session:
+        rows = crud.stream_export(session, EXPORT_CHUNK_SIZE)
+        body = csv_chunks(rows) if fmt == "csv" else column_chunks(rows)
+        if gzip:
+            body = gzip_chunks(body)
+        async for data in body:
+            yield data
@@ -0,0 +1,85 @@
+"""
+Одноразовая инициализация БД: создание таблиц, начальный справочник статусов
+и (на PostgreSQL) материализованное представление статистики.
+
+Выполняется отдельным шагом перед запуском воркеров uvicorn, а не в lifespan
+каждого воркера:
+python -m app.init_db
+alembic upgrade head  # индексы, представления и т.д. (alembic/versions)
+
+Шаг идемпотентный и выполняется под pg_advisory_xact_lock: если его запустят
+одновременно несколько процессов (или несколько воркеров с
+DB_INIT_ON_STARTUP=true), они выполнят его по очереди, а не наперегонки.
+"""
+
+import asyncio
+import logging
+import sys
+import time
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import Base, engine
+from app.log_config import setup_logging
+from app.models import StudentStatus
+from app.stats import create_view as create_stats_view
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory lock инициализации (любое число, общее для всех процессов приложения)
+INIT_LOCK_KEY = 20250674
+
+# Изменения уже существующих таблиц (create_all добавляет только новые таблицы),
+# то же, что в миграциях alembic/versions
+SCHEMA_UPGRADES = (
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS worker VARCHAR(100)",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_worker_status ON jobs (worker, status)",
+)
+
+STATUS_SEED = [
+    {"status_code": "active", "status_label": "Обучается"},
+    {"status_code": "academic_leave", "status_label": "Академический отпуск"},
+    {"status_code": "expelled", "status_label": "Отчислен"},
+    {"status_code": "reinstated", "status_label": "Восстановлен"},
+    {"status_code": "graduated", "status_label": "Завершил обучение"},
+    {"status_code": "transferred", "status_label": "Переведён"},
+    {"status_code": "postgraduate", "status_label": "Продолжает обучение"},
+    {"status_code": "debt", "status_label": "Академическая задолженность"},
+]
+
+
+async def init_db(db_engine: AsyncEngine = engine) -> None:
+    """
+    Создает недостающие таблицы и представление статистики,
+    заполняет пустой справочник статусов
+    """
+    start = time.perf_counter()
+    async with db_engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Блокировка снимается вместе с завершением транзакции
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": INIT_LOCK_KEY})
+        logger.info("СТАРТ: Создание таблиц")
+        await conn.run_sync(Base.metadata.create_all)
+        if not (await conn.execute(select(StudentStatus.status_id).limit(1))).first():
+            logger.info("Инициализация таблицы StudentStatus начальными значениями")
+            await conn.execute(insert(StudentStatus), STATUS_SEED)
+        if conn.dialect.name == "postgresql":
+            for statement in SCHEMA_UPGRADES:
+                await conn.execute(text(statement))
+            logger.info("Создание представления статистики")
+            await create_stats_view(conn)
+    logger.info(f"ФИНИШ: Инициализация БД за {time.perf_counter() - start:.2f} с")
+
+
+async def main() -> int:
+    try:
+        await init_db()
+    finally:
+        await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(asyncio.run(main()))
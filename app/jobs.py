@@ -0,0 +1,307 @@
+"""
+Фоновые задачи в процессе приложения, без внешнего брокера.
+
+Тяжелые операции (импорт, массовое удаление, пересчет статистики) ставятся
+в очередь, клиент сразу получает id задачи и опрашивает /jobs/{id}.
+Задачи выполняют asyncio-воркеры, состояние хранится в таблице jobs.
+
+Ограничения:
+JOB_WORKERS - сколько задач выполняется одновременно (всего, и столько же
+соединений с БД они могут занять);
+concurrency у типа задачи - сколько задач этого типа выполняется одновременно;
+JOB_QUEUE_SIZE - сколько задач одного типа может ждать в очереди (дальше 503).
+
+Параметры задач хранятся только в памяти процесса: при остановке приложения
+очередь дорабатывается не дольше JOB_DRAIN_TIMEOUT секунд, остальные задачи
+помечаются cancelled/failed. После аварийной остановки задачи процесса
+остаются queued/running; каждая строка jobs хранит процесс-владелец (worker),
+и при запуске процесс помечает failed задачи завершившихся процессов своего
+хоста (имя хоста контейнера сохраняется при перезапуске).
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import crud
+from app.metrics import Counter, Gauge, registry
+from app.models import Job
+from app.schemas.schemas import StudentBulkDelete
+from app.stats import get_statistics, stats_summary
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_DRAIN_TIMEOUT = float(os.getenv("JOB_DRAIN_TIMEOUT", "30"))
+# Retry-After (секунд) для ответа 503 при переполненной очереди
+JOB_RETRY_AFTER = 5
+
+# Владелец задач: хост, pid и метка запуска (pid может достаться новому процессу)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+JobHandler = Callable[[AsyncSession, Any], Awaitable[Any]]
+
+
+@dataclass
+class JobType:
+    """
+    Тип задачи: обработчик handler(db, params), схема параметров и лимит
+    одновременно выполняемых задач этого типа
+    """
+
+    name: str
+    handler: JobHandler
+    params: TypeAdapter
+    concurrency: int
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue, repr=False)
+
+
+class JobQueue:
+    """
+    Очередь фоновых задач.
+
+    register(name, ...) - декоратор, регистрирующий обработчик типа задачи
+    start(session_factory) - запустить воркеры (lifespan)
+    submit(db, job_type, params) - поставить задачу, вернуть строку jobs
+    drain(timeout) - перестать принимать задачи и дождаться очереди (lifespan)
+    """
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self.types: dict[str, JobType] = {}
+        self._session_factory: async_sessionmaker | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._accepting = False
+
+    def register(self, name: str, params: Any = None, concurrency: int = 1):
+        def decorator(handler: JobHandler) -> JobHandler:
+            self.types[name] = JobType(name, handler, TypeAdapter(params), concurrency)
+            return handler
+
+        return decorator
+
+    def queued(self) -> int:
+        return sum(job_type.queue.qsize() for job_type in self.types.values())
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._slots = asyncio.Semaphore(self.workers)
+        # Без ожидания: в режиме lazy при запуске нет обращений к БД
+        self._tasks.append(asyncio.create_task(self._fail_orphaned()))
+        for job_type in self.types.values():
+            job_type.queue = asyncio.Queue(self.queue_size)
+            # Воркеров у типа столько, сколько его задач может идти одновременно
+            for _ in range(min(job_type.concurrency, self.workers)):
+                self._tasks.append(asyncio.create_task(self._worker(job_type)))
+        self._accepting = True
+        logger.info(f"Очередь задач запущена: воркеров {self.workers}, типов {len(self.types)}")
+
+    async def submit(self, db: AsyncSession, job_type: str, params: Any = None) -> Job:
+        registered = self.types.get(job_type)
+        if registered is None:
+            raise HTTPException(
+                status_code=404,
+                detail={"message": "Unknown job type", "field": "job_type"}
+            )
+        if not self._accepting or registered.queue.full():
+            raise HTTPException(
+                status_code=503,
+                detail="Job queue is full",
+                headers={"Retry-After": str(JOB_RETRY_AFTER)},
+            )
+        try:
+            params = registered.params.validate_python(params)
+        except ValidationError as err:
+            raise RequestValidationError(
+                [{**e, "loc": ("body", "params", *e["loc"])} for e in err.errors()]
+            )
+
+        job = await db.scalar(
+            insert(Job)
+            .values(job_type=job_type, status="queued", worker=WORKER_ID)
+            .returning(Job)
+        )
+        await db.commit()
+        try:
+            registered.queue.put_nowait((job.id, params))
+        except asyncio.QueueFull:
+            # Очередь заполнилась, пока задача записывалась в БД
+            await self._finish(job_type, job.id, "cancelled", error="Job queue is full")
+            raise HTTPException(
+                status_code=503,
+                detail="Job queue is full",
+                headers={"Retry-After": str(JOB_RETRY_AFTER)},
+            )
+        logger.info(f"Задача {job.id} ({job_type}) поставлена в очередь")
+        return job
+
+    async def _worker(self, job_type: JobType) -> None:
+        while True:
+            job_id, params = await job_type.queue.get()
+            try:
+                async with self._slots:
+                    await self._run(job_type, job_id, params)
+            except Exception as err:
+                # Ошибка записи статуса (БД недоступна, истек pool_timeout):
+                # воркер должен продолжить работу, иначе задачи типа зависнут в queued
+                logger.error(
+                    f"Не удалось обработать задачу {job_id} ({job_type.name}): {err}",
+                    exc_info=err,
+                    extra={"job_id": job_id},
+                )
+                await self._mark_failed(job_id)
+            finally:
+                job_type.queue.task_done()
+
+    async def _mark_failed(self, job_id: int) -> None:
+        try:
+            await self._update(
+                job_id, status="failed", error="Internal error", finished_at=func.now()
+            )
+        except Exception as err:
+            logger.error(f"Не удалось отметить задачу {job_id} как failed: {err}")
+
+    async def _run(self, job_type: JobType, job_id: int, params: Any) -> None:
+        try:
+            await self._update(job_id, status="running", started_at=func.now())
+            async with self._session_factory() as session:
+                result = await job_type.handler(session, params)
+        except asyncio.CancelledError:
+            await self._finish(job_type.name, job_id, "failed", error="Interrupted by shutdown")
+            raise
+        except HTTPException as err:
+            await self._finish(job_type.name, job_id, "failed", error=str(err.detail))
+        except Exception as err:
+            # Как и для запросов (app/errors.py): подробности только в логе
+            error_id = uuid.uuid4()
+            logger.error(
+                f"Задача {job_id} ({job_type.name}) завершилась с ошибкой {error_id}: {err}",
+                exc_info=err,
+                extra={"error_id": error_id, "job_id": job_id},
+            )
+            await self._finish(
+                job_type.name, job_id, "failed", error=f"Internal error, error_id={error_id}"
+            )
+        else:
+            await self._finish(
+                job_type.name, job_id, "succeeded", result=jsonable_encoder(result)
+            )
+
+    async def _fail_orphaned(self) -> None:
+        """
+        Помечает failed незавершенные задачи процессов этого хоста,
+        которых больше нет (аварийная остановка)
+        """
+        host = WORKER_ID.rsplit(":", 2)[0]
+        try:
+            async with self._session_factory() as session:
+                rows = (await session.execute(
+                    select(Job.id, Job.worker).where(
+                        Job.worker.startswith(f"{host}:", autoescape=True),
+                        Job.status.in_(("queued", "running")),
+                    )
+                )).all()
+            orphaned = [job_id for job_id, worker in rows if _is_orphaned(worker)]
+            if orphaned:
+                await self._update(
+                    orphaned, status="failed", error="Interrupted by restart", finished_at=func.now()
+                )
+                logger.warning(f"Задачи прерванных процессов помечены failed: {len(orphaned)}")
+        except Exception as err:
+            logger.error(f"Не удалось проверить незавершенные задачи: {err}", exc_info=err)
+
+    async def _finish(self, job_type: str, job_id: int, status: str, **values) -> None:
+        jobs_total.inc(job_type, status)
+        await self._update(job_id, status=status, finished_at=func.now(), **values)
+
+    async def _update(self, job_id: int | list[int], **values) -> None:
+        ids = job_id if isinstance(job_id, list) else [job_id]
+        async with self._session_factory() as session:
+            await session.execute(update(Job).where(Job.id.in_(ids)).values(**values))
+            await session.commit()
+
+    async def drain(self, timeout: float) -> None:
+        self._accepting = False
+        if not self._tasks:
+            return
+        pending = [job_type.queue.join() for job_type in self.types.values()]
+        try:
+            await asyncio.wait_for(asyncio.gather(*pending), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Очередь задач не завершилась за {timeout} с, задачи прерываются")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        not_started = []
+        for job_type in self.types.values():
+            while not job_type.queue.empty():
+                not_started.append(job_type.queue.get_nowait()[0])
+                jobs_total.inc(job_type.name, "cancelled")
+        if not_started:
+            await self._update(
+                not_started, status="cancelled", error="Cancelled by shutdown", finished_at=func.now()
+            )
+        logger.info(f"Очередь задач остановлена, отменено невыполненных: {len(not_started)}")
+
+
+def _is_orphaned(worker: str) -> bool:
+    """
+    Владелец задачи на этом хосте больше не работает: его pid не существует,
+    либо pid тот же, что у текущего процесса, но метка запуска другая
+    """
+    if worker == WORKER_ID:
+        return False
+    _, pid, _ = worker.rsplit(":", 2)
+    if int(pid) == os.getpid():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+job_queue = JobQueue(JOB_WORKERS, JOB_QUEUE_SIZE)
+
+jobs_total = registry.register(Counter(
+    "jobs_total",
+    "Количество завершенных фоновых задач по типу и итогу",
+    ("job_type", "status"),
+))
+registry.register(Gauge(
+    "jobs_queued", "Фоновых задач в очереди", job_queue.queued,
+))
+
+
+@job_queue.register("import_users", params=list[dict])
+async def import_users_job(db: AsyncSession, rows: list[dict]):
+    return await crud.import_users(db, rows)
+
+
+@job_queue.register("bulk_delete_users", params=StudentBulkDelete)
+async def bulk_delete_users_job(db: AsyncSession, params: StudentBulkDelete):
+    return await crud.delete_users(db, params)
+
+
+@job_queue.register("refresh_statistics")
+async def refresh_statistics_job(db: AsyncSession, params: None):
+    await stats_summary.refresh(db)
+    return await get_statistics(db, "materialized")
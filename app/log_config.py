@@ -0,0 +1,216 @@
+"""
+Настройка логирования.
+
+Записи не пишутся в поток вывода из цикла событий: корневой логгер получает
+только QueueHandler, а форматирование и вывод выполняет QueueListener
+в отдельном потоке. Если очередь переполнена, запись отбрасывается
+(счетчик log_records_dropped), а не блокирует обработку запросов.
+
+Настройки (переменные окружения):
+LOG_LEVEL - уровень корневого логгера (INFO);
+LOG_LEVELS - уровни отдельных логгеров: "sqlalchemy.engine=INFO,app.crud=DEBUG";
+LOG_FORMAT - json (по строке JSON на запись) или text;
+LOG_QUEUE_SIZE - размер очереди записей;
+LOG_DEBUG_SAMPLE - доля DEBUG-записей, которые пишутся во время запроса (1.0 - все);
+LOG_DEBUG_SAMPLE_ROUTES - доли для отдельных маршрутов: "/read_user/{user_id}=0.01".
+
+Записи во время запроса дополняются полями method и route (LogContextMiddleware),
+error_id из обработчика ошибок передается полем extra.
+"""
+
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.metrics import Gauge, registry
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_SAMPLE = float(os.getenv("LOG_DEBUG_SAMPLE", "1.0"))
+LOG_DEBUG_SAMPLE_ROUTES = os.getenv("LOG_DEBUG_SAMPLE_ROUTES", "")
+
+TEXT_FORMAT = "[%(asctime)s] [%(levelname)s] %(name)s: %(message)s"
+
+# Поля, которые можно передать через extra=... и которые попадают в JSON
+EXTRA_FIELDS = ("error_id", "job_id", "method", "route")
+
+# Scope текущего HTTP-запроса (маршрут известен только после маршрутизации,
+# поэтому хранится сам scope, а route читается в момент записи)
+_request_scope: ContextVar[Scope | None] = ContextVar("request_scope", default=None)
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _parse_pairs(value: str) -> dict[str, str]:
+    pairs = (item.split("=", 1) for item in value.split(",") if "=" in item)
+    return {key.strip(): val.strip() for key, val in pairs}
+
+
+def current_route() -> str | None:
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    return getattr(scope.get("route"), "path", None) or scope.get("path")
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна строка JSON на запись: время, уровень, логгер, сообщение,
+    поля из EXTRA_FIELDS и трассировка исключения
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = str(value)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Добавляет method и route текущего запроса и прореживает DEBUG-записи
+    по маршрутам (LOG_DEBUG_SAMPLE, LOG_DEBUG_SAMPLE_ROUTES)
+    """
+
+    def __init__(self, default_rate: float, route_rates: dict[str, float]) -> None:
+        super().__init__()
+        self.default_rate = default_rate
+        self.route_rates = route_rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        scope = _request_scope.get()
+        if scope is None:
+            return True
+        route = current_route()
+        if not hasattr(record, "route"):
+            record.method = scope.get("method")
+            record.route = route
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self.route_rates.get(route, self.default_rate)
+        return rate >= 1.0 or random.random() < rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не ждет место в очереди: при переполнении
+    запись отбрасывается и учитывается в dropped
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # В отличие от стандартного prepare не форматирует запись целиком:
+        # форматтер в потоке QueueListener должен получить поля и exc_text отдельно
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+registry.register(Gauge(
+    "log_records_dropped", "Записей лога, отброшенных из-за переполнения очереди",
+    lambda: queue_handler.dropped,
+))
+
+
+class LogContextMiddleware:
+    """
+    ASGI middleware: делает scope запроса доступным логированию (method, route)
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+def setup_logging() -> None:
+    """
+    Подключает к корневому логгеру QueueHandler и запускает QueueListener.
+    Повторный вызов ничего не делает.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    route_rates = {route: float(rate) for route, rate in _parse_pairs(LOG_DEBUG_SAMPLE_ROUTES).items()}
+    queue_handler.addFilter(RequestContextFilter(LOG_DEBUG_SAMPLE, route_rates))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    # uvicorn настраивает свои логгеры с собственными обработчиками до импорта
+    # приложения - переводим их на общую очередь
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    for name, level in _parse_pairs(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Останавливает QueueListener, дописав оставшиеся в очереди записи
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
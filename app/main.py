@@ -3,217 +3,449 @@ https://github.com/EPoY74/ep202506_students
 API для работы со студентами
 """
 
+import csv
+import datetime
+import io
+import json
 import logging
+import os
+import time
 # import sys
-from typing import Any, AsyncGenerator
+from typing import Any, AsyncGenerator, Literal
 
-from contextlib import asynccontextmanager, suppress
-from fastapi import FastAPI, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
-from fastapi.exceptions import RequestValidationError
-from sqlalchemy import select, event, MetaData, Table
-from sqlalchemy.engine import Connection
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.ext.asyncio import AsyncSession
-from .database import async_session, engine, Base
-
-import uuid
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from .database import (
+    REPLICA_HEALTH_INTERVAL,
+    REPLICA_STICKY_SECONDS,
+    async_session,
+    engine,
+    replicas,
+)
 
 
 from app import crud
 from app.schemas import schemas
-from app.models import StudentStatus
-
-
-def setup_logging():
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format="[%(asctime)s] [%(levelname)s] %(name)s: %(message)s",
-    )
+from app.schemas.new import student_extra_info as extra_schemas
+from app.schemas.new.student import StudentReadFull
+from app.schemas.new.student_status import StudentStatusRead
+from app import metrics, singleflight
+from app.admission import AdmissionMiddleware
+from app.cache import user_cache
+from app.conditional import is_not_modified, make_etag, not_modified, set_validators
+from app.errors import register_error_handlers
+from app.export import MEDIA_TYPES, export_users
+from app.jobs import JOB_DRAIN_TIMEOUT, job_queue
+from app.log_config import LogContextMiddleware, setup_logging
+from app.init_db import init_db
+from app.models import Job
+from app.stats import STATS_REFRESH_INTERVAL, STATS_SOURCE, get_statistics, stats_summary
+from app.statuses import status_registry
 
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
-# Создаем обработчик события
-def after_create(target: MetaData | Table, connection: Connection, **kw) -> None:
-    logger.info("СТАРТ: Запуск инициализации таблицы StudentStatus начальными значениями")
-    if not connection.execute(select(StudentStatus).limit(1)).fetchone():
-        logger.info("НАЧАЛО: Инициализация таблицы StudentStatus")
-        connection.execute(
-            StudentStatus.__table__.insert(),
-            [C
-                {"status_code": "active", "status_label": "Обучается"},
-                {"status_code": "academic_leave", "status_label": "Академический отпуск"},
-                {"status_code": "expelled", "status_label": "Отчислен"},
-                {"status_code": "reinstated", "status_label": "Восстановлен"},
-                {"status_code": "graduated", "status_label": "Завершил обучение"},
-                {"status_code": "transferred", "status_label": "Переведён"},
-                {"status_code": "postgraduate", "status_label": "Продолжает обучение"},
-                {"status_code": "debt", "status_label": "Академическая задолженность"},
-            ]
-        )
-        logger.info("КОНЕЦ: Инициализация таблицы StudentStatus")
-        logger.info("ФИНИШ: Запуск инициализации таблицы StudentStatus начальными значениями")
+MAX_PAGE_SIZE = 1000  # Максимальный размер страницы для /read_users/
+STREAM_CHUNK_SIZE = 500  # Размер пачки строк при потоковой выдаче
+MAX_EXTRA_INFO_STUDENTS = 1000  # Студентов в одном запросе /extra_info/
+
+# Режим запуска: lazy - при старте нет обращений к БД (движок создается
+# первым запросом, справочник статусов загружается при первом использовании);
+# eager - справочник загружается и пул открывается при старте
+STARTUP_MODE = os.getenv("APP_STARTUP_MODE", "lazy")
+# Создание таблиц при старте (для разработки). Обычно - отдельный шаг python -m app.init_db
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "false").strip().lower() in ("1", "true", "yes", "on")
+
+
+@contextmanager
+def startup_phase(name: str):
+    """
+    Логирует длительность этапа запуска
+    """
+    start = time.perf_counter()
+    yield
+    logger.info(f"Запуск: {name} - {(time.perf_counter() - start) * 1000:.1f} мс")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
     """
-    Создает таблицы при первом запуске
+    Запускает фоновые задачи приложения.
+    Таблицы и справочник статусов создаются отдельным шагом (app/init_db.py),
+    при DB_INIT_ON_STARTUP=true - здесь же, под advisory lock.
     """
-    async with engine.begin() as conn:
-        logger.info('СТАРТ: Инициализация таблиц при первом запуске')
-        # Подписываемся на событие
-        event.listen(StudentStatus.__table__, 'after_create', after_create)
-        await conn.run_sync(Base.metadata.create_all)
-        logger.info('ФИНИШ: Инициализация таблиц при первом запуске')
-        
+    started = time.perf_counter()
+    if DB_INIT_ON_STARTUP:
+        with startup_phase("инициализация БД"):
+            await init_db(engine)
 
-    yield    
+    if STARTUP_MODE == "eager":
+        with startup_phase("справочник статусов"):
+            async with async_session() as session:
+                await status_registry.load(session)
+
+    health_checks = None
+    if replicas.engines:
+        logger.info(f"Реплик для чтения: {len(replicas.engines)}")
+        health_checks = asyncio.create_task(
+            replicas.run_health_checks(REPLICA_HEALTH_INTERVAL)
+        )
+
+    stats_refresher = asyncio.create_task(
+        stats_summary.run(async_session, STATS_REFRESH_INTERVAL)
+    )
+
+    with startup_phase("очередь задач"):
+        job_queue.start(async_session)
+    logger.info(
+        f"Запуск завершен за {(time.perf_counter() - started) * 1000:.1f} мс (режим {STARTUP_MODE})"
+    )
+
+    yield
+
+    # Сначала дорабатываем фоновые задачи: им еще нужны соединения с БД
+    await job_queue.drain(JOB_DRAIN_TIMEOUT)
+    stats_refresher.cancel()
+    if health_checks:
+        health_checks.cancel()
+        await replicas.dispose()
+    await engine.dispose()
 
    
 logger.info("Запуск приложения")
 app = FastAPI(lifespan=lifespan)
+metrics.register_pool_gauges(engine)
 logger.info("Приложение запущено")
 
 
-# Зависимость
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+# Cookie read-your-writes: до этого момента (unix time) клиент читает с основной БД
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+
+def pin_to_primary(request: Request, response: Response) -> None:
     """
-    Создает сессию для работы с БД
+    Для запросов на запись ставит клиенту cookie, чтобы следующие
+    REPLICA_STICKY_SECONDS секунд он читал с основной БД и видел свои изменения.
+    Обработчик, возвращающий собственный Response, вызывает ее сам:
+    внедренный response FastAPI в этом случае не использует.
     """
+    if replicas.engines and request.method not in ("GET", "HEAD"):
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            str(int(time.time() + REPLICA_STICKY_SECONDS)),
+            max_age=int(REPLICA_STICKY_SECONDS) + 1,
+            httponly=True,
+        )
+
 
+# Зависимость
+async def get_db(request: Request, response: Response) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Создает сессию для работы с основной БД (cookie read-your-writes - см. pin_to_primary)
+    """
+    pin_to_primary(request, response)
     async with async_session() as session:
         logger.debug('Инициалзация сесии:')
         yield session
 
 
-# Middleware для глобальной обработки ошибок
-@app.middleware("http")
-async def global_error_handler(request: Request, call_next):
+def read_session_factory(request: Request):
     """
-    Глобальный обработчик ошибок, который перехватывает все исключения,
-    возникающие при обработке HTTP-запросов.
-    
-    Принцип работы:
-    1. Пытается выполнить следующий middleware/обработчик запроса (call_next)
-    2. Если возникает исключение - перехватывает его и возвращает соответствующий JSON-ответ
-    3. Логирует все ошибки для последующего анализа
+    Фабрика сессий для чтения: реплика по кругу или основная БД,
+    если клиент недавно писал (cookie db_primary_until)
     """
-    
     try:
-        # Пробуем выполнить запрос
-        return await call_next(request)
-    
-    except RequestValidationError as exc:
-        """
-        Обработка ошибок валидации входных данных (Pydantic).
-        FastAPI автоматически генерирует эти ошибки при несоответствии данных схеме.
-        """
-        # Логируем информацию для отладки (уровень DEBUG чтобы не засорять логи в production)
-        logger.debug("Validation error", exc_info=True)
-        
-        # Возвращаем ответ в формате, совместимом с Pydantic
-        return JSONResponse(
-            status_code=422,  # HTTP 422 Unprocessable Entity - стандартный код для ошибок валидации
-            content={
-                "detail": [
-                    {
-                        "type": error["type"],  # Тип ошибки (например, "value_error.missing")
-                        "loc": error["loc"],  # Место возникновения ошибки (например, ["body", "username"])
-                        "msg": error["msg"],  # Сообщение об ошибке
-                        "input": error.get("input"),  # Неверные входные данные
-                        "ctx": error.get("ctx")  # Дополнительный контекст
-                    } for error in exc.errors()  # Преобразуем все ошибки в список
-                ]
-            }
-        )
-    
-    except HTTPException as http_exc:
-        """
-        Обработка уже созданных HTTP-исключений.
-        Эти исключения обычно создаются явно в коде обработчиков маршрутов.
-        Мы просто передаем их дальше без изменений.
-        """
-        raise http_exc
-    
-    except SQLAlchemyError as db_exc:
-        """
-        Обработка ошибок базы данных (SQLAlchemy).
-        Важно выполнить rollback транзакции и не раскрывать детали ошибки клиенту.
-        """
-        # Пытаемся выполнить rollback безопасно (suppress подавляет возможные исключения)
-        with suppress(Exception):
-            if hasattr(request.state, "db"):
-                request.state.db.rollback()
-        
-        # Логируем полную ошибку для администратора
-        logger.error("Database error", exc_info=True)
-        
-        # Возвращаем клиенту обобщенное сообщение
-        return JSONResponse(
-            status_code=400,  # HTTP 400 Bad Request - общий код для ошибок клиента
-            content={
-                "detail": [{
-                    "type": "database_error",
-                    "msg": "Database operation failed",
-                    # В production показываем общее сообщение, в debug режиме - детали
-                    "ctx": {"error": "Check logs for details"} if not app.debug else {"error": str(db_exc)}
-                }]
-            }
-        )
-    
-    except Exception as exc:
-        """
-        Обработка всех неожиданных исключений (крайний случай).
-        Генерируем уникальный ID ошибки для отслеживания и логируем полную информацию.
-        """
-        # Генерируем уникальный ID для ошибки
-        error_id = uuid.uuid4()
-        
-        # Логируем критическую ошибку с полной информацией
-        logger.critical(f"Unexpected error {error_id}: {exc}", exc_info=True)
-        
-        # Возвращаем клиенту сообщение с ID ошибки
-        return JSONResponse(
-            status_code=500,  # HTTP 500 Internal Server Error
-            content={
-                "detail": [{
-                    "type": "server_error",
-                    "msg": "Internal server error",
-                    "error_id": str(error_id),  # Уникальный ID для поиска в логах
-                    "info": "Contact support with this error_id"  # Инструкция для пользователя
-                }]
-            }
-        )
+        primary_until = float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+    if primary_until > time.time():
+        return async_session
+    return replicas.session()
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Создает сессию только для чтения (реплика, см. read_session_factory)
+    """
+    async with read_session_factory(request)() as session:
+        logger.debug('Инициалзация сесии чтения:')
+        yield session
+
+
+# Обработка ошибок: обработчики исключений и ASGI middleware (см. app/errors.py)
+register_error_handlers(app)
+# Лимиты частоты и числа одновременных запросов (429/503 с Retry-After, см. app/admission.py)
+app.add_middleware(AdmissionMiddleware)
+# Метрики запросов: добавляется последним, чтобы видеть ответы с ошибками
+app.add_middleware(metrics.MetricsMiddleware)
+# Контекст запроса для логов (method, route): снаружи всех, чтобы попасть и в записи об ошибках
+app.add_middleware(LogContextMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """
+    Метрики в формате Prometheus
+    """
+    return PlainTextResponse(
+        metrics.registry.render(), media_type="text/plain; version=0.0.4"
+    )
 
 
 @app.post("/create_user/", response_model=schemas.StudentRead)
-async def create_user(user: schemas.StudentCreate, db: AsyncSession = Depends(get_db)):
+async def create_user(
+    user: schemas.StudentCreate, upsert: bool = False, db: AsyncSession = Depends(get_db)
+):
     """
-    Создает пользователя
+    Создает пользователя.
+    upsert=true - при существующем email обновляет запись вместо ошибки 409
     """
     logger.debug('Обращение post по /create_user/ создание пользователя')
-    return await crud.create_user(db, user)
+    return await crud.create_user(db, user, upsert)
+
+
+async def stream_users_ndjson(
+    session_factory: async_sessionmaker, after_id: int | None
+) -> AsyncGenerator[bytes, None]:
+    """
+    Отдает студентов в формате NDJSON пачками.
+    Сессия открывается внутри генератора: сессия из get_db закрывается
+    до того, как StreamingResponse начнет отправлять тело.
+    """
+    async with session_factory() as session:
+        async for chunk in crud.stream_users(session, after_id, STREAM_CHUNK_SIZE):
+            yield b"".join(
+                schemas.student_row_adapter.dump_json(row) + b"\n" for row in chunk
+            )
+
+
+def student_list_response(rows: list[schemas.StudentReadRow], limit: int) -> Response:
+    """
+    Сериализует страницу студентов в JSON одним проходом pydantic-core,
+    минуя валидацию response_model. Id для следующей страницы - в X-Next-After-Id.
+    """
+    response = Response(
+        schemas.student_rows_adapter.dump_json(rows), media_type="application/json"
+    )
+    if len(rows) == limit:
+        response.headers["X-Next-After-Id"] = str(rows[-1]["id"])
+    return response
+
+
+def parse_import_body(body: bytes, content_type: str) -> list[dict]:
+    """
+    Разбирает тело запроса импорта: JSON-массив, NDJSON или CSV с заголовком
+    """
+    text = body.decode("utf-8-sig")
+    if content_type.startswith("text/csv"):
+        return list(csv.DictReader(io.StringIO(text)))
+    if content_type.startswith(("application/x-ndjson", "application/jsonl")):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    rows = json.loads(text)
+    if not isinstance(rows, list):
+        raise ValueError("JSON body must be an array")
+    return rows
+
+
+@app.post("/import_users/", response_model=schemas.StudentImportResult)
+async def import_users(
+    request: Request, background: bool = False, db: AsyncSession = Depends(get_db)
+):
+    """
+    Массовый импорт пользователей из JSON-массива, NDJSON или CSV.
+    Ошибки по отдельным строкам возвращаются в errors и не прерывают импорт.
+    background=true - импорт выполняется фоновой задачей, ответ 202 с ее id.
+    """
+    logger.debug('Обращение post по /import_users/ массовый импорт пользователей')
+    content_type = request.headers.get("content-type", "application/json")
+    try:
+        rows = parse_import_body(await request.body(), content_type)
+    except (ValueError, UnicodeDecodeError, csv.Error) as err:
+        raise HTTPException(status_code=400, detail=f"Cannot parse import data: {err}")
+    if background:
+        return job_accepted(request, await job_queue.submit(db, "import_users", rows))
+    return await crud.import_users(db, rows)
+
+
+@app.get("/statuses/", response_model=list[StudentStatusRead])
+async def read_statuses(db: AsyncSession = Depends(get_read_db)):
+    """
+    Возвращает справочник статусов из памяти.
+    К БД обращается только первый запрос, если справочник еще не загружен.
+    """
+    logger.debug('Обращение get по /statuses/, справочник статусов')
+    await status_registry.ensure_loaded(db)
+    return status_registry.all()
+
+
+@app.post("/statuses/refresh/", response_model=list[StudentStatusRead])
+async def refresh_statuses(db: AsyncSession = Depends(get_db)):
+    """
+    Перечитывает справочник статусов из БД (после его изменения)
+    """
+    logger.debug('Обращение post по /statuses/refresh/, обновление справочника')
+    status_registry.invalidate()
+    await status_registry.ensure_loaded(db)
+    return status_registry.all()
 
 
 @app.get("/read_users/", response_model=list[schemas.StudentRead])
-async def read_users(db: AsyncSession = Depends(get_db)):
+async def read_users(
+    request: Request,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int | None = Query(None, ge=0),
+    stream: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Читает пользователей постранично (курсор after_id по id).
+    Id для следующей страницы возвращается в заголовке X-Next-After-Id.
+    При stream=true отдает всех пользователей после after_id потоком NDJSON.
+    ETag страницы считается агрегатным запросом по ней, при совпадении
+    с If-None-Match ответ 304 без тела. Last-Modified для списка не отдается:
+    удаление строки или сдвиг новой строки в страницу не увеличивают
+    max(updated_at), и If-Modified-Since давал бы 304 на измененную страницу.
+    Поток (stream=true) без валидаторов: агрегат по всей таблице не дешевле самой выдачи.
+    """
+    logger.debug('Обращение get по /read_users/, страница пользователей')
+    if stream:
+        return StreamingResponse(
+            stream_users_ndjson(read_session_factory(request), after_id),
+            media_type="application/x-ndjson",
+        )
+
+    count, last_modified, last_id = await crud.get_users_version(db, limit, after_id)
+    etag = make_etag(
+        limit, after_id, count, last_id, last_modified.isoformat() if last_modified else None
+    )
+    if is_not_modified(request, etag, None):
+        return not_modified(etag, None)
+
+    users = await crud.get_users(db, limit, after_id)
+    response = student_list_response(users, limit)
+    set_validators(response, etag, None)
+    return response
+
+
+@app.get("/export_users/")
+async def export_users_registry(
+    request: Request,
+    format: Literal["csv", "columns"] = "csv",
+    gzip: bool = False,
+):
+    """
+    Полная выгрузка реестра студентов с меткой статуса.
+    Строки идут потоком с серверного курсора, память не зависит от размера таблицы.
+    format=csv - CSV с заголовком, columns - столбцовые пачки в NDJSON (см. app/export.py);
+    gzip=true - сжатие на лету (файл .gz).
+    """
+    logger.debug('Обращение get по /export_users/, выгрузка реестра')
+    media_type, extension = MEDIA_TYPES[format]
+    filename = f"students.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        export_users(read_session_factory(request), format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.get("/search_users/", response_model=list[schemas.StudentRead])
+async def search_users(
+    name: str | None = Query(None, min_length=1, max_length=50),
+    email: str | None = Query(None, max_length=50),
+    q: str | None = Query(None, min_length=1, max_length=100),
+    status_code: str | None = None,
+    born_from: datetime.date | None = None,
+    born_to: datetime.date | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int | None = Query(None, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Читает все пользователей
+    Поиск пользователей: префикс имени/фамилии (name), email без учета регистра,
+    полнотекстовый поиск по имени (q), статус и диапазон даты рождения.
+    Постраничная выдача как у /read_users/ (after_id, X-Next-After-Id).
     """
-    logger.debug('Обращение get по /read_users/, все пользователи')
-    return await crud.get_users(db)
+    logger.debug('Обращение get по /search_users/, поиск пользователей')
+    users = await crud.search_users(
+        db,
+        name=name,
+        email=email,
+        q=q,
+        status_code=status_code,
+        born_from=born_from,
+        born_to=born_to,
+        limit=limit,
+        after_id=after_id,
+    )
+    return student_list_response(users, limit)
 
 
 @app.get("/read_user/{user_id}", response_model=schemas.StudentRead)
-async def read_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def read_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Читает одного пользователя
+    Читает одного пользователя.
+    Поддерживает If-None-Match / If-Modified-Since (ответ 304 без тела).
     """
     logger.debug('Чтение данных об одном пользователе по /read_user/')
     user = await crud.get_user(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    etag = make_etag(user.id, user.updated_at.isoformat())
+    if is_not_modified(request, etag, user.updated_at):
+        return not_modified(etag, user.updated_at)
+    set_validators(response, etag, user.updated_at)
+    return user
+
+
+@app.post("/read_users_batch/", response_model=schemas.StudentBatchResult)
+async def read_users_batch(
+    lookup: schemas.StudentBatchLookup, db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Читает много пользователей за один запрос по списку id и/или email.
+    Возвращает найденных в порядке запроса и списки ненайденных id и email.
+    """
+    logger.debug('Обращение post по /read_users_batch/, пакетное чтение')
+    return await crud.get_users_batch(db, lookup.ids, lookup.emails)
+
+
+@app.get("/read_users_full/", response_model=list[StudentReadFull])
+async def read_users_full(
+    response: Response,
+    limit: int = Query(100, ge=1, le=crud.MAX_FULL_PAGE_SIZE),
+    after_id: int | None = Query(None, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Читает полные профили пользователей (статус и доп. информация) постранично
+    """
+    logger.debug('Обращение get по /read_users_full/, полные профили')
+    users = await crud.get_users_full(db, limit, after_id)
+    if len(users) == limit:
+        response.headers["X-Next-After-Id"] = str(users[-1].id)
+    return users
+
+
+@app.get("/read_user_full/{user_id}", response_model=StudentReadFull)
+async def read_user_full(user_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Читает полный профиль одного пользователя
+    """
+    logger.debug('Чтение полного профиля пользователя по /read_user_full/')
+    user = await crud.get_user_full(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -229,3 +461,179 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User deleted"}
+
+
+@app.get("/changes/", response_model=schemas.ChangesPage)
+async def read_changes(
+    since: str | None = None,
+    limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Лента изменений студентов и доп. информации (в том числе удалений).
+    Первый запрос без since отдает все записи, далее передается cursor
+    из предыдущего ответа. has_more=true - есть еще изменения, запросить сразу.
+    Читается с основной БД: незавершенные транзакции основной БД
+    на реплике не видны, и граница ленты по ним не посчиталась бы.
+    """
+    logger.debug('Обращение get по /changes/, лента изменений')
+    return await crud.get_changes(db, since, limit)
+
+
+@app.get("/statistics/", response_model=schemas.StudentStatistics)
+async def read_statistics(
+    source: Literal["live", "materialized"] = STATS_SOURCE,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Количество студентов по статусам, годам рождения и месяцам создания.
+    source=materialized - из материализованного представления (быстро,
+    данные на момент refreshed_at), live - подсчет по таблицам.
+    """
+    logger.debug('Обращение get по /statistics/, статистика')
+    return await get_statistics(db, source)
+
+
+@app.post("/statistics/refresh/", response_model=schemas.StudentStatistics)
+async def refresh_statistics(db: AsyncSession = Depends(get_db)):
+    """
+    Принудительно обновляет материализованное представление статистики
+    """
+    logger.debug('Обращение post по /statistics/refresh/, обновление статистики')
+    await stats_summary.refresh(db)
+    return await get_statistics(db, "materialized")
+
+
+@app.post("/users_bulk_delete/", response_model=schemas.StudentBulkDeleteResult)
+async def bulk_delete_users(
+    params: schemas.StudentBulkDelete, db: AsyncSession = Depends(get_db)
+):
+    """
+    Массовое удаление или архивирование пользователей по списку id или фильтру.
+    Выполняется одним запросом, возвращает id затронутых пользователей.
+    """
+    logger.debug('Обращение post по /users_bulk_delete/, массовое удаление')
+    return await crud.delete_users(db, params)
+
+
+@app.post("/extra_info/", response_model=list[extra_schemas.StudentExtraInfoRead])
+async def create_extra_info(
+    batch: extra_schemas.StudentExtraInfoBatchCreate, db: AsyncSession = Depends(get_db)
+):
+    """
+    Добавляет пачку доп. информации (адреса, жалобы и т.п.) одним запросом
+    """
+    logger.debug('Обращение post по /extra_info/, добавление доп. информации')
+    return await crud.create_extra_info(db, batch.items)
+
+
+@app.get("/extra_info/", response_model=list[extra_schemas.StudentExtraInfoGroup])
+async def read_extra_info(
+    student_ids: list[int] = Query(..., min_length=1, max_length=MAX_EXTRA_INFO_STUDENTS),
+    info_type: str | None = Query(None, max_length=30),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Доп. информация нескольких студентов (?student_ids=1&student_ids=2),
+    сгруппированная по студентам, с необязательным фильтром по info_type
+    """
+    logger.debug('Обращение get по /extra_info/, чтение доп. информации')
+    return await crud.get_extra_info(db, student_ids, info_type)
+
+
+@app.put("/extra_info/{info_id}", response_model=extra_schemas.StudentExtraInfoRead)
+async def update_extra_info(
+    info_id: int,
+    data: extra_schemas.StudentExtraInfoUpdate,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Изменяет одну запись доп. информации
+    """
+    logger.debug('Обращение put по /extra_info/, изменение доп. информации')
+    info = await crud.update_extra_info(db, info_id, data)
+    if not info:
+        raise HTTPException(status_code=404, detail="Extra info not found")
+    return info
+
+
+@app.post("/extra_info_bulk_delete/", response_model=extra_schemas.StudentExtraInfoDeleteResult)
+async def bulk_delete_extra_info(
+    params: extra_schemas.StudentExtraInfoBatchDelete, db: AsyncSession = Depends(get_db)
+):
+    """
+    Удаляет доп. информацию по списку id одним запросом
+    """
+    logger.debug('Обращение post по /extra_info_bulk_delete/, удаление доп. информации')
+    return await crud.delete_extra_info(db, params.ids)
+
+
+def job_accepted(request: Request, job: Job) -> JSONResponse:
+    """
+    Ответ 202 на постановку фоновой задачи, адрес состояния - в Location
+    """
+    response = JSONResponse(
+        status_code=202,
+        content=jsonable_encoder(schemas.JobRead.model_validate(job)),
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+    pin_to_primary(request, response)
+    return response
+
+
+@app.post("/jobs/", response_model=schemas.JobRead, status_code=202)
+async def submit_job(
+    request: Request, job: schemas.JobSubmit, db: AsyncSession = Depends(get_db)
+):
+    """
+    Ставит фоновую задачу в очередь: import_users (params - список строк),
+    bulk_delete_users (params как у /users_bulk_delete/), refresh_statistics.
+    Состояние - /jobs/{id}, результат - /jobs/{id}/result.
+    """
+    logger.debug('Обращение post по /jobs/, постановка фоновой задачи')
+    return job_accepted(request, await job_queue.submit(db, job.job_type, job.params))
+
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobRead)
+async def read_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Состояние фоновой задачи (читается с основной БД, без задержки реплик)
+    """
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+async def read_job_result(job_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Результат успешно выполненной задачи.
+    Пока задача не завершилась или если она завершилась ошибкой - 409.
+    """
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "succeeded":
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Job has no result", "status": job.status, "error": job.error},
+        )
+    return job.result
+
+
+@app.get("/cache/stats/")
+async def cache_stats():
+    """
+    Статистика кэша чтения пользователей (попадания, промахи, размер)
+    """
+    return user_cache.stats()
+
+
+@app.get("/coalescing/stats/")
+async def coalescing_stats():
+    """
+    Статистика объединения одинаковых одновременных чтений по функциям crud:
+    executed - запросов в БД, coalesced - вызовов, получивших чужой результат
+    """
+    return singleflight.stats()
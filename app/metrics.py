@@ -0,0 +1,250 @@
+"""
+Метрики приложения в формате Prometheus (text exposition format 0.0.4).
+
+Счетчики и гистограммы хранятся в памяти процесса и отдаются по /metrics.
+Метрики пула соединений снимаются в момент запроса /metrics.
+"""
+
+import functools
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.pool import QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+T = TypeVar("T")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """
+    Монотонно растущий счетчик с метками
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, values)} {amount}"
+            for values, amount in self._values.items()
+        ]
+
+
+class Histogram:
+    """
+    Гистограмма длительностей с фиксированными границами корзин
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.buckets = buckets
+        # метки -> [счетчики по корзинам (последняя +Inf), сумма]
+        self._values: dict[tuple[str, ...], list[Any]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        item = self._values.get(label_values)
+        if item is None:
+            item = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        item[0][bisect_left(self.buckets, value)] += 1
+        item[1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        bucket_labels = self.labels + ("le",)
+        for values, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_labels, values + (le,))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    Значение, вычисляемое функцией в момент снятия метрик
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, doc: str, func: Callable[[], float | None]) -> None:
+        self.name = name
+        self.doc = doc
+        self.func = func
+
+    def samples(self) -> list[str]:
+        try:
+            value = self.func()
+            # None - значения пока нет (например, движок БД еще не создан)
+            return [] if value is None else [f"{self.name} {value}"]
+        except Exception:
+            logger.warning(f"Не удалось получить значение метрики {self.name}", exc_info=True)
+            return []
+
+
+class Registry:
+    """
+    Набор метрик, отдаваемых по /metrics
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram | Gauge] = {}
+
+    def register(self, metric: T) -> T:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total",
+    "Количество HTTP-запросов",
+    ("method", "route", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Длительность обработки HTTP-запросов в секундах",
+    ("method", "route", "status"),
+))
+db_query_duration_seconds = registry.register(Histogram(
+    "db_query_duration_seconds",
+    "Длительность функций crud в секундах",
+    ("function",),
+))
+app_errors_total = registry.register(Counter(
+    "app_errors_total",
+    "Количество ошибок по категориям (validation, database, unexpected)",
+    ("category",),
+))
+
+
+def register_pool_gauges(engine) -> None:
+    """
+    Регистрирует метрики пула соединений движка SQLAlchemy.
+    Движок создается лениво (app.database.LazyEngine): пока его нет
+    или пул не QueuePool, метрики пула не отдаются.
+    """
+
+    def pool_stat(read: Callable[[QueuePool], int]) -> Callable[[], int | None]:
+        def value() -> int | None:
+            if not getattr(engine, "created", True):
+                return None
+            pool = engine.pool
+            return read(pool) if isinstance(pool, QueuePool) else None
+
+        return value
+
+    registry.register(Gauge(
+        "db_pool_size", "Размер пула соединений", pool_stat(QueuePool.size),
+    ))
+    registry.register(Gauge(
+        "db_pool_checked_out", "Соединений выдано из пула", pool_stat(QueuePool.checkedout),
+    ))
+    registry.register(Gauge(
+        "db_pool_checked_in", "Свободных соединений в пуле", pool_stat(QueuePool.checkedin),
+    ))
+    registry.register(Gauge(
+        "db_pool_overflow",
+        "Соединений открыто сверх pool_size",
+        pool_stat(lambda pool: max(pool.overflow(), 0)),
+    ))
+
+
+def track_db(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Декоратор для функций crud: пишет их длительность в db_query_duration_seconds
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs) -> T:
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            db_query_duration_seconds.observe(time.perf_counter() - start, func.__name__)
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: считает запросы и их длительность по маршруту и статусу.
+    Маршрут берется из шаблона пути (/read_user/{user_id}), чтобы не плодить метки.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            labels = (scope["method"], route_path, str(status_code))
+            http_requests_total.inc(*labels)
+            http_request_duration_seconds.observe(time.perf_counter() - start, *labels)
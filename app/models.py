@@ -1,9 +1,13 @@
 import datetime
 
-from sqlalchemy import String, Integer, ForeignKey, Index, DateTime, func, Date
+from sqlalchemy import JSON, String, Integer, ForeignKey, Index, DateTime, func, Date, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
+# Выражение полнотекстового поиска по имени и фамилии.
+# Запросы должны использовать его дословно, иначе индекс ix_students_name_fts не применится.
+STUDENT_NAME_TSVECTOR = "to_tsvector('simple', first_name || ' ' || last_name)"
+
 
 class StudentStatus(Base):
     """
@@ -37,6 +41,10 @@ class StudentExtraInfo(Base):
     """
 
     __tablename__ = "student_extra_info"
+    __table_args__ = (
+        # Лента изменений: WHERE (updated_at, id) > (:ts, :id) ORDER BY updated_at, id
+        Index("ix_student_extra_info_updated_at_id", "updated_at", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     student_id: Mapped[int] = mapped_column(
         ForeignKey("students.id"), nullable=False, index=True
@@ -75,6 +83,21 @@ class Student(Base):
     __tablename__ = "students"
     __table_args__ = (
         Index("ix_student_lastname_firstname", "last_name", "first_name"),
+        Index("ix_students_status_code", "status_code"),
+        Index("ix_students_date_of_birth", "date_of_birth"),
+        Index("ix_students_email_lower", func.lower(text("email"))),
+        # Лента изменений: WHERE (updated_at, id) > (:ts, :id) ORDER BY updated_at, id
+        Index("ix_students_updated_at_id", "updated_at", "id"),
+        # Индексы только для PostgreSQL: поиск по префиксу и полнотекстовый поиск
+        Index(
+            "ix_students_last_name_prefix", text("lower(last_name) text_pattern_ops")
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_students_first_name_prefix", text("lower(first_name) text_pattern_ops")
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_students_name_fts", text(STUDENT_NAME_TSVECTOR), postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -94,9 +117,70 @@ class Student(Base):
         nullable=False,
     )
 
+    # lazy="raise_on_sql": связи загружаются только явно (selectinload/joinedload),
+    # неявная ленивая загрузка в async-коде и N+1 запросы дают ошибку
     status: Mapped["StudentStatus"] = relationship(
-        "StudentStatus", back_populates="students"
+        "StudentStatus", back_populates="students", lazy="raise_on_sql"
     )
     extra_info: Mapped[list["StudentExtraInfo"]] = relationship(
-        "StudentExtraInfo", back_populates="student"
+        "StudentExtraInfo", back_populates="student", lazy="raise_on_sql"
+    )
+
+
+class StudentTombstone(Base):
+    """
+    Отметки об удалении для ленты изменений (/changes/)
+
+    __tablename__ = "student_tombstones" - Наименование таблицы
+    id (int) - Уникальный ID отметки
+    entity (str) - Что удалено: student или extra_info
+    entity_id (int) - ID удаленной записи
+    deleted_at (DateTime) - Время удаления
+    """
+
+    __tablename__ = "student_tombstones"
+    __table_args__ = (
+        Index("ix_student_tombstones_deleted_at_id", "deleted_at", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=False), server_default=func.now(), nullable=False
+    )
+
+
+class Job(Base):
+    """
+    Фоновая задача (см. app/jobs.py)
+
+    __tablename__ = "jobs" - Наименование таблицы
+    id (int) - Уникальный ID задачи
+    job_type (str) - Тип задачи (import_users, bulk_delete_users и др.)
+    status (str) - queued, running, succeeded, failed или cancelled
+    result (JSON) - Результат успешно выполненной задачи
+    error (str) - Описание ошибки для failed/cancelled
+    created_at (DateTime) - Время постановки в очередь
+    started_at (DateTime) - Время начала выполнения
+    finished_at (DateTime) - Время завершения
+    worker (str) - Процесс, принявший задачу: хост:pid:метка запуска (см. app/jobs.py)
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Поиск незавершенных задач процесса при перезапуске
+        Index("ix_jobs_worker_status", "worker", "status"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    job_type: Mapped[str] = mapped_column(String(30), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    result: Mapped[dict | list | None] = mapped_column(JSON, nullable=True)
+    error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=False), server_default=func.now(), nullable=False
     )
+    started_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=False), nullable=True)
+    finished_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=False), nullable=True)
+    worker: Mapped[str | None] = mapped_column(String(100), nullable=True)
@@ -2,11 +2,11 @@
 Pydantic схема для модели Student
 """
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import List
 from pydantic import BaseModel, EmailStr
-from app.schemas.student_status import StudentStatusRead
-from app.schemas.student_extra_info import StudentExtraInfoRead
+from app.schemas.new.student_status import StudentStatusRead
+from app.schemas.new.student_extra_info import StudentExtraInfoRead
 
 
 class StudentBase(BaseModel):
@@ -14,6 +14,7 @@ class StudentBase(BaseModel):
     last_name: str
     email: EmailStr
     status_code: str
+    date_of_birth: date
 
 
 class StudentCreate(StudentBase):
@@ -3,22 +3,53 @@ Pydantic схема для модели StudentExtraInfo
 """
 
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class StudentExtraInfoBase(BaseModel):
-    info_type: str
-    info_value: str
+    info_type: str = Field(max_length=30)
+    info_value: str = Field(max_length=255)
 
 
 class StudentExtraInfoCreate(StudentExtraInfoBase):
     student_id: int
 
 
+class StudentExtraInfoUpdate(StudentExtraInfoBase):
+    pass
+
+
 class StudentExtraInfoRead(StudentExtraInfoBase):
     id: int
+    student_id: int
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class StudentExtraInfoBatchCreate(BaseModel):
+    """
+    Пачка записей доп. информации, вставляется одним INSERT
+    """
+
+    items: list[StudentExtraInfoCreate] = Field(min_length=1, max_length=1000)
+
+
+class StudentExtraInfoGroup(BaseModel):
+    """
+    Доп. информация одного студента (items пустой, если записей нет)
+    """
+
+    student_id: int
+    items: list[StudentExtraInfoRead]
+
+
+class StudentExtraInfoBatchDelete(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=10000)
+
+
+class StudentExtraInfoDeleteResult(BaseModel):
+    deleted: int
+    ids: list[int]
@@ -2,8 +2,10 @@
 Pydantic-схемы для работы с пользователями (создание, чтение и т.д.)
 """
 
-from pydantic import BaseModel, EmailStr
-from datetime import date
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, model_validator
+from datetime import date, datetime
+from typing import Any, Literal
+from typing_extensions import TypedDict
 
 
 class StudentBase(BaseModel):
@@ -33,3 +35,178 @@ class StudentRead(StudentBase):
 
     class Config:
         from_attributes = True  # Важно для совместимости с ORM
+
+
+class StudentReadVersioned(StudentRead):
+    """
+    StudentRead с временем последнего изменения (для ETag / Last-Modified).
+    В ответ updated_at не попадает: response_model эндпоинтов - StudentRead.
+    """
+    updated_at: datetime
+
+
+class StudentReadRow(TypedDict):
+    """
+    Строка студента из БД в виде словаря (поля StudentRead в том же порядке).
+    Используется для быстрой сериализации списков без создания моделей Pydantic:
+    данные из БД уже корректны, поэтому повторная валидация не нужна.
+    """
+    first_name: str
+    last_name: str
+    email: str
+    status_code: str
+    date_of_birth: date
+    id: int
+
+
+# Сериализаторы pydantic-core: словари сразу в JSON-байты
+student_row_adapter = TypeAdapter(StudentReadRow)
+student_rows_adapter = TypeAdapter(list[StudentReadRow])
+
+
+class StudentImportError(BaseModel):
+    """
+    Ошибка импорта одной строки
+    """
+    row: int  # Номер строки во входных данных (с 0)
+    type: str  # validation_error | invalid_status | duplicate_email
+    msg: str
+    email: str | None = None
+
+
+class StudentImportResult(BaseModel):
+    """
+    Результат массового импорта студентов
+    """
+    total: int
+    created: int
+    created_ids: list[int]
+    errors: list[StudentImportError]
+
+
+class StudentBulkDelete(BaseModel):
+    """
+    Массовое удаление или архивирование студентов.
+    Нужен хотя бы один фильтр: ids, status_code или born_to.
+
+    mode - delete (удалить) или archive (сменить статус на archive_status)
+    cascade - при удалении удалить и доп. информацию студентов,
+    иначе при ее наличии вернуть ошибку 409
+    """
+    ids: list[int] | None = Field(None, max_length=10000)
+    status_code: str | None = None
+    born_to: date | None = None
+    mode: Literal["delete", "archive"] = "delete"
+    archive_status: str = "expelled"
+    cascade: bool = True
+
+    @model_validator(mode="after")
+    def check_filter(self):
+        if not self.ids and not self.status_code and not self.born_to:
+            raise ValueError("At least one filter is required: ids, status_code or born_to")
+        return self
+
+
+class StudentBulkDeleteResult(BaseModel):
+    """
+    Результат массового удаления: id затронутых студентов
+    """
+    mode: str
+    affected: int
+    ids: list[int]
+
+
+class StudentBatchLookup(BaseModel):
+    """
+    Пакетное чтение студентов по списку id и/или email (не более 1000 каждого)
+    """
+    ids: list[int] = Field(default_factory=list, max_length=1000)
+    emails: list[EmailStr] = Field(default_factory=list, max_length=1000)
+
+    @model_validator(mode="after")
+    def check_keys(self):
+        if not self.ids and not self.emails:
+            raise ValueError("At least one of ids or emails is required")
+        return self
+
+
+class StudentBatchResult(BaseModel):
+    """
+    Найденные студенты в порядке запроса (сначала по ids, затем по emails)
+    и ненайденные id / email
+    """
+    items: list[StudentRead]
+    missing_ids: list[int]
+    missing_emails: list[str]
+
+
+class StatusCount(BaseModel):
+    status_code: str
+    status_label: str
+    count: int
+
+
+class BirthYearCount(BaseModel):
+    year: int | None
+    count: int
+
+
+class CreatedMonthCount(BaseModel):
+    month: str | None  # YYYY-MM
+    count: int
+
+
+class StudentStatistics(BaseModel):
+    """
+    Сводная статистика по студентам
+    """
+    source: str  # live | materialized
+    refreshed_at: datetime | None
+    total: int
+    by_status: list[StatusCount]
+    by_birth_year: list[BirthYearCount]
+    by_created_month: list[CreatedMonthCount]
+
+
+class ChangeItem(BaseModel):
+    """
+    Одно изменение в ленте: запись создана/изменена (upsert) или удалена (delete)
+    """
+    entity: Literal["student", "extra_info"]
+    op: Literal["upsert", "delete"]
+    id: int
+    changed_at: datetime
+    data: dict | None = None  # Текущее состояние записи, для delete - None
+
+
+class ChangesPage(BaseModel):
+    """
+    Страница ленты изменений. cursor передается в следующий запрос как since
+    """
+    items: list[ChangeItem]
+    cursor: str
+    has_more: bool
+
+
+class JobSubmit(BaseModel):
+    """
+    Постановка фоновой задачи: тип и параметры (формат зависит от типа)
+    """
+    job_type: str
+    params: Any = None
+
+
+class JobRead(BaseModel):
+    """
+    Состояние фоновой задачи (результат - отдельно, /jobs/{id}/result)
+    """
+    id: int
+    job_type: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
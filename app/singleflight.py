@@ -0,0 +1,138 @@
+"""
+Объединение одновременных одинаковых чтений (single-flight).
+
+Если функция crud с теми же аргументами уже выполняется, новый вызов
+не идет в БД (и не занимает соединение из пула), а ждет результат
+выполняющегося вызова. Результат не кэшируется: после завершения
+вызова следующий снова идет в БД (кэш - app/cache.py).
+
+Ключ вызова - аргументы функции без сессии плюс БД сессии (основная
+или реплика), так что чтения с разных БД не объединяются.
+Записи вызывают forget_all(): начатые до записи вызовы больше
+не принимают новых участников, и клиент видит свою запись.
+"""
+
+import asyncio
+import functools
+import logging
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+db_calls_coalesced_total = registry.register(Counter(
+    "db_calls_coalesced_total",
+    "Вызовов crud, получивших результат уже выполняющегося одинакового вызова",
+    ("function",),
+))
+
+
+class _LeaderCancelled(Exception):
+    """
+    Выполнявший запрос вызов отменен (клиент отключился): участники
+    выполняют запрос сами
+    """
+
+
+class SingleFlight:
+    """
+    Выполняющиеся вызовы одной функции по ключам.
+
+    executed - сколько вызовов выполнено на самом деле
+    coalesced - сколько вызовов получили чужой результат
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        in_flight = self._calls.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            db_calls_coalesced_total.inc(self.name)
+            try:
+                # shield: отмена участника не должна отменять общий результат
+                return await asyncio.shield(in_flight)
+            except _LeaderCancelled:
+                return await call()
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.executed += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            self._fail(future, _LeaderCancelled())
+            raise
+        except Exception as err:
+            self._fail(future, err)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    @staticmethod
+    def _fail(future: asyncio.Future, err: Exception) -> None:
+        future.set_exception(err)
+        # Если участников нет, исключение никто не заберет - не логировать это
+        future.exception()
+
+    def forget(self) -> None:
+        self._calls.clear()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.executed + self.coalesced
+        return {
+            "name": self.name,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+
+flights: dict[str, SingleFlight] = {}
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, set)):
+        return tuple(value)
+    return value
+
+
+def coalesce(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Декоратор для функций чтения crud вида func(db, *args, **kwargs)
+    """
+    flight = flights.setdefault(func.__name__, SingleFlight(func.__name__))
+
+    @functools.wraps(func)
+    async def wrapper(db: AsyncSession, *args, **kwargs) -> T:
+        key = (
+            db.bind,
+            tuple(_freeze(arg) for arg in args),
+            tuple(sorted((name, _freeze(value)) for name, value in kwargs.items())),
+        )
+        return await flight.do(key, lambda: func(db, *args, **kwargs))
+
+    return wrapper
+
+
+def forget_all() -> None:
+    for flight in flights.values():
+        flight.forget()
+
+
+def stats() -> list[dict[str, Any]]:
+    return [flight.stats() for flight in flights.values()]
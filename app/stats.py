@@ -0,0 +1,164 @@
+"""
+Сводная статистика по студентам: количество по статусам,
+по годам рождения и по месяцам создания карточки.
+
+Источники:
+live - GROUP BY по таблицам в момент запроса;
+materialized - материализованное представление student_stats
+(создается в init_db или миграциями 0002/0005), обновляется в фоне, если были записи.
+Время обновления хранится в самом представлении (refreshed_at), так что
+все воркеры отдают одно и то же значение.
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+from app.schemas.schemas import StudentStatistics
+
+logger = logging.getLogger(__name__)
+
+# Один запрос на все разрезы: он же - тело материализованного представления
+STATS_QUERY = """
+SELECT 'status' AS dimension, s.status_code AS key, s.status_label AS label, count(st.id) AS count
+FROM student_status s
+LEFT JOIN students st ON st.status_code = s.status_code
+GROUP BY s.status_code, s.status_label
+UNION ALL
+SELECT 'birth_year', extract(year FROM date_of_birth)::int::text, NULL, count(*)
+FROM students
+GROUP BY 2
+UNION ALL
+SELECT 'created_month', to_char(date_trunc('month', created_at), 'YYYY-MM'), NULL, count(*)
+FROM students
+GROUP BY 2
+"""
+
+STATS_VIEW = "student_stats"
+
+# Тело представления: статистика и время ее подсчета (now() на момент REFRESH)
+STATS_VIEW_QUERY = f"SELECT stats.*, now() AS refreshed_at FROM ({STATS_QUERY}) AS stats"
+
+# Создание представления (идемпотентно); уникальный индекс нужен для REFRESH ... CONCURRENTLY
+STATS_VIEW_DDL = (
+    f"CREATE MATERIALIZED VIEW IF NOT EXISTS {STATS_VIEW} AS {STATS_VIEW_QUERY}",
+    f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{STATS_VIEW}_dimension_key ON {STATS_VIEW} (dimension, key)",
+)
+
+# live | materialized
+STATS_SOURCE = os.getenv("STATS_SOURCE", "live")
+# Как часто (секунд) проверять, нужно ли обновить представление
+STATS_REFRESH_INTERVAL = float(os.getenv("STATS_REFRESH_INTERVAL", "60"))
+
+
+def build_statistics(rows, source: str, refreshed_at: datetime.datetime | None) -> StudentStatistics:
+    by_status, by_birth_year, by_created_month = [], [], []
+    for dimension, key, label, count in rows:
+        if dimension == "status":
+            by_status.append({"status_code": key, "status_label": label, "count": count})
+        elif dimension == "birth_year":
+            by_birth_year.append({"year": int(key) if key else None, "count": count})
+        else:
+            by_created_month.append({"month": key, "count": count})
+    by_birth_year.sort(key=lambda item: (item["year"] is None, item["year"]))
+    by_created_month.sort(key=lambda item: item["month"] or "")
+    return StudentStatistics(
+        source=source,
+        refreshed_at=refreshed_at,
+        total=sum(item["count"] for item in by_status),
+        by_status=by_status,
+        by_birth_year=by_birth_year,
+        by_created_month=by_created_month,
+    )
+
+
+class StatsSummary:
+    """
+    Обновление материализованного представления.
+    Записи помечают данные устаревшими (mark_dirty), фоновая задача
+    обновляет представление не чаще раза в STATS_REFRESH_INTERVAL секунд.
+    """
+
+    def __init__(self) -> None:
+        self.dirty = True
+
+    def mark_dirty(self) -> None:
+        self.dirty = True
+
+    async def refresh(self, db: AsyncSession) -> None:
+        # Флаг сбрасывается до обновления, чтобы не потерять записи, сделанные
+        # во время него, и возвращается, если обновление не удалось
+        self.dirty = False
+        try:
+            # CONCURRENTLY не блокирует чтение (нужен уникальный индекс, см. STATS_VIEW_DDL)
+            await db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {STATS_VIEW}"))
+            await db.commit()
+        except BaseException:
+            self.dirty = True
+            raise
+        logger.info("Обновлено представление статистики")
+
+    async def run(self, session_factory: async_sessionmaker, interval: float) -> None:
+        """
+        Фоновое обновление. Запускается всегда (source=materialized можно запросить
+        при любом STATS_SOURCE), обновляет представление, только если оно есть.
+        """
+        while True:
+            if self.dirty:
+                try:
+                    async with session_factory() as session:
+                        if await view_exists(session):
+                            await self.refresh(session)
+                except Exception:
+                    logger.error("Не удалось обновить представление статистики", exc_info=True)
+            await asyncio.sleep(interval)
+
+
+stats_summary = StatsSummary()
+
+
+async def view_exists(db: AsyncSession) -> bool:
+    if (await db.connection()).dialect.name != "postgresql":
+        return False
+    return await db.scalar(text("SELECT to_regclass(:view) IS NOT NULL"), {"view": STATS_VIEW})
+
+
+async def create_view(conn: AsyncConnection) -> None:
+    """
+    Создает представление, если его нет. Представление прежней версии
+    (без колонки refreshed_at) пересоздается.
+    """
+    outdated = await conn.scalar(
+        text(
+            "SELECT to_regclass(:view) IS NOT NULL AND NOT EXISTS ("
+            "SELECT 1 FROM pg_attribute "
+            "WHERE attrelid = to_regclass(:view) AND attname = 'refreshed_at')"
+        ),
+        {"view": STATS_VIEW},
+    )
+    if outdated:
+        await conn.execute(text(f"DROP MATERIALIZED VIEW {STATS_VIEW}"))
+    for statement in STATS_VIEW_DDL:
+        await conn.execute(text(statement))
+
+
+async def get_statistics(db: AsyncSession, source: str) -> StudentStatistics:
+    if source == "materialized":
+        try:
+            result = await db.execute(
+                text(f"SELECT dimension, key, label, count, refreshed_at FROM {STATS_VIEW}")
+            )
+            rows = result.all()
+            refreshed_at = rows[0].refreshed_at if rows else None
+            return build_statistics([row[:4] for row in rows], source, refreshed_at)
+        except ProgrammingError:
+            # Представление не создано (init_db не выполнялся) - считаем напрямую
+            logger.warning(f"Представление {STATS_VIEW} не найдено, статистика считается по таблицам")
+            await db.rollback()
+    result = await db.execute(text(STATS_QUERY))
+    return build_statistics(result.all(), "live", datetime.datetime.now())
@@ -0,0 +1,63 @@
+"""
+Реестр статусов студентов в памяти процесса.
+Таблица student_status маленькая и почти не меняется, поэтому она
+загружается один раз при старте (lifespan) и проверки status_code
+выполняются без обращения к БД.
+"""
+
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import StudentStatus
+from app.schemas.new.student_status import StudentStatusRead
+
+logger = logging.getLogger(__name__)
+
+
+class StatusRegistry:
+    """
+    Кэш справочника статусов.
+
+    load(db) - загрузить справочник из БД (замена выполняется целиком)
+    ensure_loaded(db) - загрузить, если справочник не загружен или сброшен
+    invalidate() - сбросить справочник, следующее обращение перечитает его
+    """
+
+    def __init__(self) -> None:
+        self._statuses: dict[str, StudentStatusRead] = {}
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def load(self, db: AsyncSession) -> None:
+        result = await db.execute(select(StudentStatus).order_by(StudentStatus.status_id))
+        self._statuses = {
+            status.status_code: StudentStatusRead.model_validate(status)
+            for status in result.scalars()
+        }
+        self._loaded = True
+        logger.info(f"Загружен справочник статусов: {len(self._statuses)} записей")
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self._loaded:
+            await self.load(db)
+
+    def invalidate(self) -> None:
+        self._loaded = False
+        logger.info("Справочник статусов сброшен")
+
+    def is_valid(self, status_code: str) -> bool:
+        return status_code in self._statuses
+
+    def codes(self) -> set[str]:
+        return set(self._statuses)
+
+    def all(self) -> list[StudentStatusRead]:
+        return list(self._statuses.values())
+
+
+status_registry = StatusRegistry()
@@ -0,0 +1,78 @@
+"""
+Сравнение накладных расходов обработки ошибок:
+BaseHTTPMiddleware (@app.middleware("http")) против чистого ASGI middleware.
+
+Оба приложения отдают маленький JSON без обращения к БД, запросы идут
+в процессе через httpx.ASGITransport.
+
+Запуск: python -m devtools.bench_middleware [число запросов] [параллельность]
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.errors import ServerErrorMiddleware, server_error_response
+
+
+def make_base_http_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def global_error_handler(request: Request, call_next):
+        try:
+            return await call_next(request)
+        except Exception as exc:
+            return server_error_response(exc)
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    return app
+
+
+def make_pure_asgi_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ServerErrorMiddleware)
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    return app
+
+
+async def run(app: FastAPI, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one() -> None:
+            async with semaphore:
+                response = await client.get("/ping")
+                response.raise_for_status()
+
+        # Прогрев
+        await asyncio.gather(*(one() for _ in range(min(requests, 200))))
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, concurrency: int) -> None:
+    base_rps = await run(make_base_http_app(), requests, concurrency)
+    pure_rps = await run(make_pure_asgi_app(), requests, concurrency)
+    print(f"Запросов: {requests}, параллельность: {concurrency}")
+    print(f"BaseHTTPMiddleware: {base_rps:10.0f} RPS")
+    print(f"ASGI middleware:    {pure_rps:10.0f} RPS")
+    print(f"Разница:            {(pure_rps / base_rps - 1) * 100:+9.1f} %")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    parallel = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(total, parallel))
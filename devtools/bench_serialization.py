@@ -0,0 +1,78 @@
+"""
+Сравнение сериализации списков студентов:
+ORM-объекты через response_model (валидация в StudentRead, dump, json.dumps)
+против строк-словарей, сериализуемых одним проходом TypeAdapter.dump_json.
+
+БД не нужна: оба приложения отдают заранее созданные данные,
+запросы идут в процессе через httpx.ASGITransport.
+
+Запуск: python -m devtools.bench_serialization [размеры страниц через запятую]
+"""
+
+import asyncio
+import datetime
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, Response
+
+from app.models import Student
+from app.schemas import schemas
+
+REPEATS = 20
+
+
+def make_rows(size: int) -> list[dict]:
+    return [
+        {
+            "first_name": f"Имя{i}",
+            "last_name": f"Фамилия{i}",
+            "email": f"student_{i}@example.ru",
+            "status_code": "active",
+            "date_of_birth": datetime.date(2000, 1, 1) + datetime.timedelta(days=i % 5000),
+            "id": i,
+        }
+        for i in range(size)
+    ]
+
+
+def make_app(size: int) -> FastAPI:
+    rows = make_rows(size)
+    students = [Student(**row) for row in rows]
+    app = FastAPI()
+
+    @app.get("/orm", response_model=list[schemas.StudentRead])
+    async def orm():
+        return students
+
+    @app.get("/rows", response_model=list[schemas.StudentRead])
+    async def fast():
+        return Response(schemas.student_rows_adapter.dump_json(rows), media_type="application/json")
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, url: str) -> float:
+    await client.get(url)  # Прогрев
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        response = await client.get(url)
+        response.raise_for_status()
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+async def main(sizes: list[int]) -> None:
+    print(f"{'строк':>8} {'ORM, мс':>10} {'строки, мс':>11} {'ускорение':>10}")
+    for size in sizes:
+        transport = httpx.ASGITransport(app=make_app(size))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            assert (await client.get("/orm")).json() == (await client.get("/rows")).json()
+            orm_ms = await measure(client, "/orm")
+            rows_ms = await measure(client, "/rows")
+        print(f"{size:8} {orm_ms:10.2f} {rows_ms:11.2f} {orm_ms / rows_ms:9.1f}x")
+
+
+if __name__ == "__main__":
+    page_sizes = [int(x) for x in sys.argv[1].split(",")] if len(sys.argv) > 1 else [100, 1000, 10000]
+    asyncio.run(main(page_sizes))
@@ -0,0 +1,505 @@
+"""
+Нагрузочное тестирование API.
+
+Прогоняет сценарии по всем эндпоинтам app.main через httpx.ASGITransport
+(приложение работает в том же процессе, сеть и uvicorn не участвуют)
+с заданной параллельностью. Результаты (p50/p95/p99, RPS, ошибки) пишутся
+в JSON-файл, который можно сравнить с предыдущим прогоном.
+
+Нужна БД из .env. Данные для тестов создаются командой seed.
+
+Примеры:
+python -m devtools.benchmark seed --dataset 100k
+python -m devtools.benchmark run --requests 2000 --concurrency 50 --output bench.json
+python -m devtools.benchmark run --only read_user,search_users --compare bench.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from urllib.parse import quote
+
+import httpx
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.database import async_session, engine
+from app.models import Student, StudentExtraInfo
+
+DATASETS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SEED_EMAIL_DOMAIN = "bench-students.ru"
+SEED_BATCH_SIZE = 5_000
+BULK_DELETE_SIZE = 100  # Записей в одном запросе /users_bulk_delete/, /extra_info_bulk_delete/
+STATUSES = ("active", "academic_leave", "expelled", "graduated", "debt")
+FIRST_NAMES = ("Иван", "Петр", "Анна", "Мария", "Олег", "Елена", "Сергей", "Ольга")
+LAST_NAMES = ("Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Волков")
+
+# Доля выполненных запросов с ответом вне ok_statuses, при которой прогон считается ошибочным
+MAX_ERROR_RATE = 0.01
+# Рост p95 (в долях), который при сравнении считается регрессией
+REGRESSION_THRESHOLD = 0.10
+
+
+@dataclass
+class Scenario:
+    """
+    Сценарий нагрузки: функция build(i) возвращает (метод, путь, json-тело)
+    """
+
+    name: str
+    build: Callable[[int], tuple[str, str, object | None]]
+    ok_statuses: tuple[int, ...] = (200,)
+    requests_factor: float = 1.0  # Доля от общего числа запросов (для тяжелых сценариев)
+    # Подготовка данных перед замером, получает число запросов сценария
+    prepare: Callable[[int], Awaitable[None]] | None = None
+    # Обработка успешного ответа (запомнить созданный id, курсор и т.п.)
+    on_response: Callable[[httpx.Response], None] | None = None
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    duration: float
+    latencies: list[float] = field(default_factory=list, repr=False)
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.requests / self.duration, 1) if self.duration else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+        }
+
+
+def seed_row(i: int) -> dict:
+    rnd = random.Random(i)
+    return {
+        "first_name": rnd.choice(FIRST_NAMES),
+        "last_name": rnd.choice(LAST_NAMES),
+        "email": f"student_{i}@{SEED_EMAIL_DOMAIN}",
+        "status_code": rnd.choice(STATUSES),
+        "date_of_birth": datetime.date(1990, 1, 1) + datetime.timedelta(days=rnd.randrange(365 * 15)),
+    }
+
+
+async def seed(size: int) -> None:
+    """
+    Доводит число тестовых студентов до size (повторный запуск не создает дубликатов)
+    """
+    from app.init_db import init_db
+    from app.main import lifespan, app
+
+    await init_db()
+    async with lifespan(app):
+        async with async_session() as session:
+            existing = (await session.execute(
+                select(func.count()).where(Student.email.like(f"%@{SEED_EMAIL_DOMAIN}"))
+            )).scalar_one()
+            print(f"Тестовых студентов в БД: {existing}, нужно: {size}")
+            start = time.perf_counter()
+            for batch_start in range(existing, size, SEED_BATCH_SIZE):
+                rows = [seed_row(i) for i in range(batch_start, min(size, batch_start + SEED_BATCH_SIZE))]
+                await session.execute(
+                    pg_insert(Student).on_conflict_do_nothing(index_elements=[Student.email]), rows
+                )
+                await session.commit()
+                print(f"  вставлено до {batch_start + len(rows)}", end="\r")
+            print(f"\nГотово за {time.perf_counter() - start:.1f} с")
+    await engine.dispose()
+
+
+async def insert_throwaway_students(tag: str, run: int, count: int) -> list[int]:
+    """
+    Вставляет count тестовых студентов напрямую в БД (данные для сценариев удаления)
+    """
+    ids: list[int] = []
+    async with async_session() as session:
+        for batch_start in range(0, count, SEED_BATCH_SIZE):
+            rows = [
+                {**seed_row(i), "email": f"{tag}_{run}_{i}@{SEED_EMAIL_DOMAIN}"}
+                for i in range(batch_start, min(count, batch_start + SEED_BATCH_SIZE))
+            ]
+            ids += (await session.scalars(
+                pg_insert(Student).values(rows).returning(Student.id)
+            )).all()
+        await session.commit()
+    return ids
+
+
+async def insert_throwaway_extra_info(student_ids: list[int], count: int) -> list[int]:
+    """
+    Вставляет count записей доп. информации для student_ids напрямую в БД
+    (данные для сценариев изменения и удаления)
+    """
+    ids: list[int] = []
+    async with async_session() as session:
+        for batch_start in range(0, count, SEED_BATCH_SIZE):
+            rows = [
+                {
+                    "student_id": student_ids[i % len(student_ids)],
+                    "info_type": "bench",
+                    "info_value": f"Запись {i}",
+                }
+                for i in range(batch_start, min(count, batch_start + SEED_BATCH_SIZE))
+            ]
+            ids += (await session.scalars(
+                insert(StudentExtraInfo).values(rows).returning(StudentExtraInfo.id)
+            )).all()
+        await session.commit()
+    return ids
+
+
+async def load_context() -> dict:
+    async with async_session() as session:
+        min_id, max_id = (await session.execute(
+            select(func.min(Student.id), func.max(Student.id))
+        )).one()
+    if min_id is None:
+        raise SystemExit("В БД нет студентов, сначала выполните: python -m devtools.benchmark seed")
+    return {"min_id": min_id, "max_id": max_id, "run": int(time.time())}
+
+
+def make_scenarios(ctx: dict) -> list[Scenario]:
+    rnd = random.Random(42)
+    min_id, max_id, run = ctx["min_id"], ctx["max_id"], ctx["run"]
+    # Небольшое «горячее» множество id, как в реальном трафике
+    hot_ids = [rnd.randint(min_id, max_id) for _ in range(100)]
+    created_ids: list[int] = ctx.setdefault("created_ids", [])
+
+    def new_student(i: int) -> dict:
+        row = seed_row(i)
+        row["email"] = f"bench_{run}_{i}@{SEED_EMAIL_DOMAIN}"
+        row["date_of_birth"] = row["date_of_birth"].isoformat()
+        return row
+
+    def import_batch(i: int) -> list[dict]:
+        return [new_student(1_000_000 + i * 100 + j) for j in range(100)]
+
+    def extra_info_batch(i: int) -> dict:
+        return {"items": [
+            {"student_id": student_id, "info_type": "address", "info_value": f"Адрес {i}"}
+            for student_id in rnd.sample(hot_ids, 10)
+        ]}
+
+    def delete_user(i: int):
+        user_id = created_ids.pop() if created_ids else max_id + 1
+        return "DELETE", f"/user_delete/{user_id}", None
+
+    # Клиент инкрементальной синхронизации: каждый запрос продолжает с курсора предыдущего
+    changes_cursor: dict[str, str | None] = {"since": None}
+
+    def changes(i: int):
+        since = changes_cursor["since"]
+        query = f"&since={quote(since)}" if since else ""
+        return "GET", f"/changes/?limit=500{query}", None
+
+    def advance_changes(response: httpx.Response) -> None:
+        changes_cursor["since"] = response.json()["cursor"]
+
+    extra_info_ids: list[int] = []
+    extra_info_delete_ids: list[int] = []
+
+    async def prepare_extra_info_update(requests: int) -> None:
+        extra_info_ids.extend(await insert_throwaway_extra_info(hot_ids, min(requests, 1000)))
+
+    def extra_info_update(i: int):
+        info_id = extra_info_ids[i % len(extra_info_ids)]
+        return "PUT", f"/extra_info/{info_id}", {"info_type": "bench", "info_value": f"Изменено {i}"}
+
+    async def prepare_extra_info_delete(requests: int) -> None:
+        extra_info_delete_ids.extend(
+            await insert_throwaway_extra_info(hot_ids, requests * BULK_DELETE_SIZE)
+        )
+
+    def extra_info_delete(i: int):
+        ids = extra_info_delete_ids[i * BULK_DELETE_SIZE:(i + 1) * BULK_DELETE_SIZE]
+        return "POST", "/extra_info_bulk_delete/", {"ids": ids}
+
+    job_ids: list[int] = []
+
+    def submit_job(i: int):
+        rows = [new_student(2_000_000 + i * 10 + j) for j in range(10)]
+        return "POST", "/jobs/", {"job_type": "import_users", "params": rows}
+
+    def record_job(response: httpx.Response) -> None:
+        if response.status_code == 202:
+            job_ids.append(response.json()["id"])
+
+    def poll_job(i: int):
+        job_id = job_ids[i % len(job_ids)] if job_ids else 0
+        return "GET", f"/jobs/{job_id}", None
+
+    bulk_delete_ids: list[int] = []
+
+    async def prepare_bulk_delete(requests: int) -> None:
+        bulk_delete_ids.extend(
+            await insert_throwaway_students("bulk_delete", run, requests * BULK_DELETE_SIZE)
+        )
+
+    def bulk_delete(i: int):
+        ids = bulk_delete_ids[i * BULK_DELETE_SIZE:(i + 1) * BULK_DELETE_SIZE]
+        return "POST", "/users_bulk_delete/", {"ids": ids, "mode": "delete"}
+
+    return [
+        Scenario("statuses", lambda i: ("GET", "/statuses/", None)),
+        Scenario("read_user", lambda i: ("GET", f"/read_user/{rnd.choice(hot_ids)}", None)),
+        Scenario(
+            "read_user_cold",
+            lambda i: ("GET", f"/read_user/{rnd.randint(min_id, max_id)}", None),
+            ok_statuses=(200, 404),
+        ),
+        Scenario(
+            "read_users",
+            lambda i: ("GET", f"/read_users/?limit=100&after_id={rnd.randint(min_id, max_id)}", None),
+        ),
+        Scenario(
+            "read_users_stream",
+            lambda i: ("GET", f"/read_users/?stream=true&after_id={max(min_id, max_id - 10_000)}", None),
+            requests_factor=0.01,
+        ),
+        Scenario(
+            "export_users",
+            lambda i: ("GET", "/export_users/?gzip=true", None),
+            requests_factor=0.01,
+        ),
+        Scenario(
+            "search_users",
+            lambda i: ("GET", f"/search_users/?name={rnd.choice(LAST_NAMES)[:3]}&limit=50", None),
+        ),
+        Scenario(
+            "read_user_full",
+            lambda i: ("GET", f"/read_user_full/{rnd.choice(hot_ids)}", None),
+        ),
+        Scenario(
+            "read_users_full",
+            lambda i: ("GET", f"/read_users_full/?limit=100&after_id={rnd.randint(min_id, max_id)}", None),
+        ),
+        Scenario(
+            "read_users_batch",
+            lambda i: (
+                "POST",
+                "/read_users_batch/",
+                {"ids": rnd.sample(hot_ids, 20) + [rnd.randint(min_id, max_id) for _ in range(30)]},
+            ),
+        ),
+        Scenario(
+            "extra_info",
+            lambda i: (
+                "GET",
+                "/extra_info/?" + "&".join(f"student_ids={x}" for x in rnd.sample(hot_ids, 20)),
+                None,
+            ),
+        ),
+        Scenario(
+            "extra_info_create",
+            lambda i: ("POST", "/extra_info/", extra_info_batch(i)),
+            requests_factor=0.05,
+        ),
+        Scenario(
+            "extra_info_update",
+            extra_info_update,
+            requests_factor=0.2,
+            prepare=prepare_extra_info_update,
+        ),
+        Scenario(
+            "extra_info_bulk_delete",
+            extra_info_delete,
+            requests_factor=0.05,
+            prepare=prepare_extra_info_delete,
+        ),
+        Scenario(
+            "create_user",
+            lambda i: ("POST", "/create_user/", new_student(i)),
+            on_response=lambda response: created_ids.append(response.json()["id"]),
+        ),
+        Scenario(
+            "import_users",
+            lambda i: ("POST", "/import_users/", import_batch(i)),
+            requests_factor=0.05,
+        ),
+        Scenario(
+            "jobs_submit",
+            submit_job,
+            # 503 - очередь задач заполнена (ожидаемый отказ под нагрузкой)
+            ok_statuses=(202, 503),
+            requests_factor=0.1,
+            on_response=record_job,
+        ),
+        # Опрос состояния задач, поставленных jobs_submit (без него - 404)
+        Scenario("jobs_poll", poll_job, ok_statuses=(200, 404)),
+        Scenario("user_delete", delete_user, ok_statuses=(200, 404)),
+        Scenario(
+            "users_bulk_delete",
+            bulk_delete,
+            requests_factor=0.05,
+            prepare=prepare_bulk_delete,
+        ),
+        Scenario("changes", changes, on_response=advance_changes),
+        Scenario(
+            "statistics_live",
+            lambda i: ("GET", "/statistics/?source=live", None),
+            requests_factor=0.1,
+        ),
+        Scenario(
+            "statistics_materialized",
+            lambda i: ("GET", "/statistics/?source=materialized", None),
+        ),
+        Scenario(
+            "statistics_refresh",
+            lambda i: ("POST", "/statistics/refresh/", None),
+            requests_factor=0.01,
+        ),
+        Scenario("statuses_refresh", lambda i: ("POST", "/statuses/refresh/", None), requests_factor=0.05),
+        Scenario("cache_stats", lambda i: ("GET", "/cache/stats/", None)),
+        Scenario("metrics", lambda i: ("GET", "/metrics", None), requests_factor=0.05),
+    ]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int
+) -> ScenarioResult:
+    result = ScenarioResult(scenario.name, requests, 0, 0.0)
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for i in counter:
+            method, url, body = scenario.build(i)
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            result.latencies.append(time.perf_counter() - start)
+            if response.status_code not in scenario.ok_statuses:
+                result.errors += 1
+            elif scenario.on_response:
+                scenario.on_response(response)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, previous: dict) -> bool:
+    """
+    Печатает разницу с предыдущим прогоном, возвращает True при регрессии p95
+    """
+    regression = False
+    print(f"\nСравнение с {previous.get('revision')} ({previous.get('started_at')}):")
+    for name, stats in current["scenarios"].items():
+        old = previous.get("scenarios", {}).get(name)
+        if not old or not old["p95_ms"]:
+            continue
+        change = stats["p95_ms"] / old["p95_ms"] - 1
+        mark = "РЕГРЕССИЯ" if change > REGRESSION_THRESHOLD else ""
+        regression |= bool(mark)
+        print(
+            f"  {name:20} p95 {old['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f} мс ({change:+.0%}) "
+            f"RPS {old['rps']:8.1f} -> {stats['rps']:8.1f} {mark}"
+        )
+    return regression
+
+
+async def run(args: argparse.Namespace) -> int:
+    from app.main import app, lifespan
+
+    async with lifespan(app):
+        ctx = await load_context()
+        scenarios = make_scenarios(ctx)
+        if args.only:
+            selected = set(args.only.split(","))
+            scenarios = [s for s in scenarios if s.name in selected]
+
+        report = {
+            "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "students": ctx["max_id"] - ctx["min_id"] + 1,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "scenarios": {},
+        }
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            failed = False
+            print(f"{'сценарий':20} {'запросов':>8} {'ошибок':>7} {'RPS':>9} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8}")
+            for scenario in scenarios:
+                requests = max(1, int(args.requests * scenario.requests_factor))
+                if scenario.prepare:
+                    await scenario.prepare(requests)
+                result = await run_scenario(client, scenario, requests, args.concurrency)
+                stats = result.to_dict()
+                report["scenarios"][scenario.name] = stats
+                failed |= result.errors > requests * MAX_ERROR_RATE
+                print(
+                    f"{scenario.name:20} {stats['requests']:8} {stats['errors']:7} {stats['rps']:9.1f} "
+                    f"{stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f}"
+                )
+
+    regression = False
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regression = compare(report, json.load(file))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты записаны в {args.output}")
+    await engine.dispose()
+    return 1 if failed or regression else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочное тестирование API студентов")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Создать тестовые данные")
+    seed_parser.add_argument("--dataset", choices=DATASETS, default="10k")
+
+    run_parser = commands.add_parser("run", help="Запустить сценарии")
+    run_parser.add_argument("--requests", type=int, default=1000, help="Запросов на сценарий")
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--only", help="Сценарии через запятую")
+    run_parser.add_argument("--output", help="Файл JSON для результатов")
+    run_parser.add_argument("--compare", help="Файл JSON предыдущего прогона")
+    run_parser.add_argument(
+        "--rate-limits", action="store_true", help="Не отключать лимиты частоты (app/admission.py)"
+    )
+
+    args = parser.parse_args()
+    if args.command == "run" and not args.rate_limits:
+        # Все запросы идут от одного клиента: без этого меряются лимиты, а не API
+        os.environ["RATE_LIMIT_RPS"] = "0"
+        os.environ["RATE_LIMIT_ROUTES"] = ""
+    if args.command == "seed":
+        asyncio.run(seed(DATASETS[args.dataset]))
+        return 0
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
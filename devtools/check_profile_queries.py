@@ -0,0 +1,48 @@
+"""
+Проверка количества SQL-запросов при чтении полных профилей.
+
+crud.get_users_full должен выполнять ровно 2 запроса (студенты с JOIN статуса
+и один запрос доп. информации) при любом размере страницы вплоть до
+crud.MAX_FULL_PAGE_SIZE, то есть без N+1. На пустой странице запрос один.
+
+Запуск (нужна БД из .env с данными):
+python -m devtools.check_profile_queries
+"""
+
+import asyncio
+import sys
+
+from sqlalchemy import event
+
+from app import crud
+from app.database import async_session, engine
+
+EXPECTED_QUERIES = 2
+PAGE_SIZES = (1, 10, 100, crud.MAX_FULL_PAGE_SIZE)
+
+
+async def main() -> int:
+    executed: list[str] = []
+
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+    failed = 0
+    for limit in PAGE_SIZES:
+        async with async_session() as session:
+            # Первый запрос сессии не должен попасть в подсчет
+            await session.connection()
+            executed.clear()
+            users = await crud.get_users_full(session, limit)
+        expected = EXPECTED_QUERIES if users else 1
+        status = "OK" if len(executed) == expected else "FAIL"
+        failed += status == "FAIL"
+        print(f"{status:4} limit={limit}: студентов {len(users)}, запросов {len(executed)}")
+    event.remove(engine.sync_engine, "before_cursor_execute", count_query)
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
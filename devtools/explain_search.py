@@ -0,0 +1,82 @@
+"""
+Проверка планов запросов поиска (/search_users/) через EXPLAIN.
+
+Для каждого вида фильтра строит запрос crud.build_search_query и проверяет,
+что в плане есть ожидаемый индекс (EXPECTED_INDEXES).
+
+Ограничение: проверка идет с enable_seqscan = off и enable_indexscan = off.
+Без них на маленькой таблице планировщик честно выбирает Seq Scan, а для
+ORDER BY id LIMIT - обход всего students_pkey с фильтром, и индекс условия
+в плане не виден. С этими настройками остаются только bitmap-сканирования,
+которые порядок по id дать не могут, так что проверяется применимость индекса
+к условию, а не то, что планировщик выберет его на реальных данных.
+
+Запуск (нужна БД из .env с индексами: python -m app.init_db или миграция 0001):
+python -m devtools.explain_search
+"""
+
+import asyncio
+import datetime
+import json
+import sys
+
+from sqlalchemy import text
+
+from app.crud import build_search_query
+from app.database import engine
+
+CASES = {
+    "name prefix": {"name": "Pet"},
+    "email": {"email": "Student@Example.com"},
+    "full text": {"q": "ivan"},
+    "status": {"status_code": "active"},
+    "date_of_birth range": {
+        "born_from": datetime.date(2000, 1, 1),
+        "born_to": datetime.date(2001, 1, 1),
+    },
+}
+
+# Индексы (app/models.py, миграция 0001), которые должны быть в плане каждого случая
+EXPECTED_INDEXES = {
+    "name prefix": {"ix_students_last_name_prefix", "ix_students_first_name_prefix"},
+    "email": {"ix_students_email_lower"},
+    "full text": {"ix_students_name_fts"},
+    "status": {"ix_students_status_code"},
+    "date_of_birth range": {"ix_students_date_of_birth"},
+}
+
+
+def used_indexes(plan: dict) -> set[str]:
+    """
+    Возвращает индексы, которые используются в плане
+    """
+    found = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        found |= used_indexes(child)
+    return found
+
+
+async def main() -> int:
+    failed = 0
+    async with engine.connect() as conn:
+        await conn.execute(text("SET enable_seqscan = off"))
+        await conn.execute(text("SET enable_indexscan = off"))
+        for case, filters in CASES.items():
+            stmt = build_search_query(**filters)
+            sql = str(stmt.compile(engine.sync_engine, compile_kwargs={"literal_binds": True}))
+            result = await conn.execute(text("EXPLAIN (FORMAT JSON) " + sql))
+            plan_json = result.scalar_one()
+            plan = (plan_json if isinstance(plan_json, list) else json.loads(plan_json))[0]["Plan"]
+            indexes = used_indexes(plan)
+            missing = EXPECTED_INDEXES[case] - indexes
+            status = "FAIL" if missing else "OK"
+            failed += status == "FAIL"
+            print(f"{status:4} {case}: индексы {', '.join(sorted(indexes)) or '-'}")
+            if missing:
+                print(f"     не используются: {', '.join(sorted(missing))}")
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))